@@ -0,0 +1,46 @@
+# analysis_executor.py
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+class AnalysisExecutor:
+    """
+    Fan CPU-bound per-page analysis out to worker processes.
+
+    Payloads are sent to the pool in chunks and results come back in input order.
+    Task functions must be module-level and payloads plain picklable data (strings,
+    tuples, PageSnapshots), never parse trees. With max_workers=1 everything runs
+    in the calling process. One executor may be shared by several threads.
+    """
+
+    def __init__(self, max_workers=None, chunksize=8):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.chunksize = chunksize
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def map(self, func, payloads):
+        payloads = list(payloads)
+        if self.max_workers <= 1 or len(payloads) <= 1:
+            return [func(payload) for payload in payloads]
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            pool = self._pool
+        chunksize = max(1, min(self.chunksize, len(payloads) // self.max_workers))
+        return list(pool.map(func, payloads, chunksize=chunksize))
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
@@ -1,12 +1,16 @@
 # analysis_functions.py
 
 import requests
-from bs4 import BeautifulSoup
 import os
 import json
-from sklearn.feature_extraction.text import TfidfVectorizer
-from textatistic import Textatistic
-from urls_utils import headers, sanitize_url_for_directory
+from keyword_engine import StreamingKeywordExtractor
+from keyword_matcher import KeywordMatcher
+import numpy as np
+from readability import get_engine, interpret_readability
+from page_store import PageStore, ensure_snapshots
+from analysis_executor import AnalysisExecutor
+from entity_engine import DEFAULT_CHAR_BUDGET, EntityExtractor
+from result_store import JsonResultStore
 
 def generate_article_json_ld(title, author, date_published, image_url, description):
     """
@@ -33,163 +37,226 @@ def generate_article_json_ld(title, author, date_published, image_url, descripti
         }
     }
 
-def extract_keywords(sitemap_data):
-    corpus = []
+def save_results(analysis, items, main_save_directory, result_store=None):
+    """
+    Store (url, result) pairs for one analysis in result_store, or, without one, in the
+    per-URL JSON layout under main_save_directory (<url>/<analysis>.json plus
+    aggregated_<analysis>.json).
+    """
+    if result_store is None:
+        with JsonResultStore(main_save_directory) as store:
+            store.put_many(analysis, items)
+    else:
+        result_store.put_many(analysis, items)
+        result_store.flush()
+
+def fetch_pages(sitemap_data, page_store=None, executor=None):
+    """
+    Look up (or fetch) every page in the sitemap and make sure each one is parsed.
+    Pages that still need parsing are parsed in the executor's worker processes.
+    """
+    if page_store is None:
+        page_store = PageStore()
+    if executor is None:
+        executor = AnalysisExecutor(max_workers=1)
+    pages = []
     for url in sitemap_data.keys():
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = soup.get_text()
-            corpus.append(text)
+            pages.append(page_store.fetch(url))
         except requests.RequestException as e:
             print(f"Failed to fetch {url}: {e}")
+    ensure_snapshots(pages, executor)
+    return pages
 
-    vectorizer = TfidfVectorizer(stop_words='english', max_features=10)
-    if len(set(corpus)) > 1:
-        tfidf_matrix = vectorizer.fit_transform(corpus)
-        keywords = vectorizer.get_feature_names_out()
-        return keywords
-    return []
+def build_keyword_index(sitemap_data, page_store=None, executor=None):
+    """
+    Feed every page's text to a StreamingKeywordExtractor, one page at a time.
+    """
+    engine = StreamingKeywordExtractor()
+    for page in fetch_pages(sitemap_data, page_store, executor):
+        engine.add_document(page.url, page.snapshot().text)
+    return engine
 
-def content_organization_strategy(sitemap_data, main_save_directory):
-    analysis_results = []
-    for url in sitemap_data.keys():
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            headings = [heading.text.strip() for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
-            result = {
-                "url": url,
-                "headings": headings,
-                "number_of_sections": len(soup.find_all(['section'])),
-                "recommendations": []
-            }
+def extract_keywords(sitemap_data, page_store=None, executor=None, main_save_directory=None, result_store=None):
+    """
+    The site's top 10 keywords. Given main_save_directory or result_store, each page's
+    top 10 TF-IDF terms are also saved as the 'page_keywords' analysis.
+    """
+    engine = build_keyword_index(sitemap_data, page_store, executor)
+    if main_save_directory is not None or result_store is not None:
+        save_results('page_keywords', ((url, {"url": url,
+                                              "keywords": [{"term": term, "tfidf": score} for term, score in terms]})
+                                       for url, terms in engine.page_keywords(10)),
+                     main_save_directory, result_store)
+    return engine.top_terms(10)
 
-            if len([h for h in headings if h.lower() == 'h1']) > 1:
-                result["recommendations"].append("Avoid using multiple H1 tags.")
-
-            # Check for Schema Markup
-            scripts = soup.find_all('script', {'type': 'application/ld+json'})
-            if scripts:
-                result["schema_detected"] = True
-            else:
-                result["schema_detected"] = False
-                title = soup.find('title').get_text() if soup.find('title') else ""
-                description_tag = soup.find('meta', attrs={'name': 'description'})
-                description = description_tag['content'] if description_tag else ""
-                # Suggest adding structured data for an article
-                article_data = generate_article_json_ld(title, "Unknown Author", "Unknown Date", "Unknown Image URL",
-                                                        description)
-                json_ld_script = f'<script type="application/ld+json">{json.dumps(article_data, indent=2)}</script>'
-                result["schema_suggestion"] = json_ld_script
-
-            # Create a subdirectory for this URL's analysis
-            url_subdir = os.path.join(main_save_directory, sanitize_url_for_directory(url))
-            os.makedirs(url_subdir, exist_ok=True)
-
-            with open(os.path.join(url_subdir, 'content_organization_analysis.json'), 'w') as file:
-                json.dump(result, file, indent=2)  # Save the individual result
-
-            analysis_results.append(result)
-        except requests.RequestException as e:
-            print(f"Failed to fetch {url}: {e}")
+def analyze_content_organization(snapshot):
+    """
+    Analyze the heading structure and schema markup of a single page.
+    """
+    result = {
+        "url": snapshot.url,
+        "headings": [text for level, text in snapshot.headings],
+        "number_of_sections": snapshot.section_count,
+        "recommendations": []
+    }
+
+    if len(snapshot.h1) > 1:
+        result["recommendations"].append("Avoid using multiple H1 tags.")
 
-    # Optionally, you can save the aggregated results to the main directory
-    with open(os.path.join(main_save_directory, 'aggregated_content_organization_analysis.json'), 'w') as file:
-        json.dump(analysis_results, file, indent=2)
+    # Check for Schema Markup
+    if snapshot.json_ld:
+        result["schema_detected"] = True
+    else:
+        result["schema_detected"] = False
+        title = snapshot.title or ""
+        description = snapshot.meta_description or ""
+        # Suggest adding structured data for an article
+        article_data = generate_article_json_ld(title, "Unknown Author", "Unknown Date", "Unknown Image URL",
+                                                description)
+        json_ld_script = f'<script type="application/ld+json">{json.dumps(article_data, indent=2)}</script>'
+        result["schema_suggestion"] = json_ld_script
+    return result
+
+def content_organization_strategy(sitemap_data, main_save_directory, page_store=None, executor=None,
+                                  result_store=None):
+    if page_store is None:
+        page_store = PageStore()
+    if executor is None:
+        executor = AnalysisExecutor(max_workers=1)
+    pages = fetch_pages(sitemap_data, page_store, executor)
+
+    # Reuse stored results for pages whose content has not changed and analyze the rest in the executor
+    results = [page_store.get_analysis(page, 'content_organization') for page in pages]
+    pending = [i for i, result in enumerate(results) if result is None]
+    computed = executor.map(analyze_content_organization, [pages[i].snapshot().compact() for i in pending])
+    for i, result in zip(pending, computed):
+        results[i] = result
+        page_store.put_analysis(pages[i], 'content_organization', result)
+
+    save_results('content_organization_analysis', ((page.url, result) for page, result in zip(pages, results)),
+                 main_save_directory, result_store)
 
     print("Content Organization Strategy Analysis completed and saved.")
 
-def url_optimization_analysis(sitemap_data, keywords, main_save_directory):
+def url_optimization_analysis(sitemap_data, keywords, main_save_directory, page_store=None, executor=None,
+                              result_store=None):
+    # Compiled once for the crawl; each page's text is then scanned once for all keywords
+    matcher = KeywordMatcher(keywords)
     url_analysis_results = []
-    for url in sitemap_data.keys():
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            result = {
-                "url": url,
-                "title": soup.title.string if soup.title else "No title",
-                "meta_description": soup.find("meta", attrs={"name": "description"})["content"] if soup.find("meta", attrs={"name": "description"}) else "No meta description",
-                "keywords": [keyword.get_text() for keyword in soup.find_all("meta", attrs={"name": "keywords"})],
-                "h1": [h1.get_text() for h1 in soup.find_all('h1')],
-                "top_keywords": [keyword for keyword in keywords if keyword in soup.get_text()]
-            }
+    for page in fetch_pages(sitemap_data, page_store, executor):
+        url = page.url
+        snapshot = page.snapshot()
+        # Character spans of every match in the page's visible text, in keyword order
+        found = matcher.positions(snapshot.text)
+        keyword_positions = {keyword: found[keyword] for keyword in matcher.keywords if keyword in found}
+        keyword_counts = {keyword: len(spans) for keyword, spans in keyword_positions.items()}
+        result = {
+            "url": url,
+            "title": snapshot.title if snapshot.title is not None else "No title",
+            "meta_description": snapshot.meta_description if snapshot.meta_description is not None else "No meta description",
+            "keywords": snapshot.meta_keywords,
+            "h1": snapshot.h1,
+            "top_keywords": list(keyword_counts),
+            "keyword_counts": keyword_counts,
+            "keyword_positions": keyword_positions
+        }
+        url_analysis_results.append((url, result))
 
-            # Create a subdirectory for this URL's analysis
-            url_subdir = os.path.join(main_save_directory, sanitize_url_for_directory(url))
-            os.makedirs(url_subdir, exist_ok=True)
+    save_results('url_optimization_analysis', url_analysis_results, main_save_directory, result_store)
 
-            with open(os.path.join(url_subdir, 'url_optimization_analysis.json'), 'w') as file:
-                json.dump(result, file, indent=2)  # Save the individual result
+    print("URL Optimization Analysis completed and saved.")
 
-            url_analysis_results.append(result)
-        except requests.RequestException as e:
-            print(f"Failed to fetch {url}: {e}")
+ENTITY_BATCH_SIZE = 32
+
+def named_entity_analysis(sitemap_data, main_save_directory, page_store=None, executor=None,
+                          char_budget=DEFAULT_CHAR_BUDGET, result_store=None):
+    """
+    Named entities for every page, plus the entities found on the most pages of the crawl.
+    Pages are analyzed in batches in this process, so sentences repeated across pages
+    (navigation, footers) are only tagged once.
+    """
+    extractor = EntityExtractor(char_budget=char_budget)
+    pages = fetch_pages(sitemap_data, page_store, executor)
 
-    # Optionally, you can save the aggregated results to the main directory
-    with open(os.path.join(main_save_directory, 'aggregated_url_optimization_analysis.json'), 'w') as file:
-        json.dump(url_analysis_results, file, indent=2)
+    def page_entities():
+        for start in range(0, len(pages), ENTITY_BATCH_SIZE):
+            batch = pages[start:start + ENTITY_BATCH_SIZE]
+            for page, entities in zip(batch, extractor.extract_many([page.snapshot().text for page in batch])):
+                yield page.url, {
+                    "url": page.url,
+                    "named_entities": [{"entity": entity, "label": label} for entity, label in entities]
+                }
 
-    print("URL Optimization Analysis completed and saved.")
+    save_results('named_entities', page_entities(), main_save_directory, result_store)
 
-def content_analysis_input(sitemap_data, main_save_directory):
-    content_results = []
-    for url in sitemap_data.keys():
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text_content = soup.get_text()
-
-            # Remove words that are longer than 100 characters
-            text_content = " ".join(word if len(word) <= 100 else "" for word in text_content.split())
-
-            # Check if the text content is not empty
-            if text_content.strip():
-                try:
-                    text_stats = Textatistic(text_content)
-                    readability_score = text_stats.flesch_score
-
-                    result = {
-                        "url": url,
-                        "readability_score": readability_score,
-                        "interpretation": "",
-                        "recommendations": []
-                    }
-
-                    if readability_score < 0:
-                        result["interpretation"] = "Extremely difficult to read."
-                        result["recommendations"].append("Check for complex sentences and lack of punctuation.")
-                        result["recommendations"].append("Consider simplifying the language.")
-                    elif readability_score < 30:
-                        result["interpretation"] = "Difficult to read."
-                        result["recommendations"].append("Simplify sentences and use more common words.")
-                    elif readability_score < 60:
-                        result["interpretation"] = "Moderately difficult to read."
-                        result["recommendations"].append("Consider breaking up long sentences.")
-                    else:
-                        result["interpretation"] = "Easy to read."
-
-                    # Create a subdirectory for this URL's analysis
-                    url_subdir = os.path.join(main_save_directory, sanitize_url_for_directory(url))
-                    os.makedirs(url_subdir, exist_ok=True)
-
-                    with open(os.path.join(url_subdir, 'content_analysis_input.json'), 'w') as file:
-                        json.dump(result, file, indent=2)  # Save the individual result
-
-                    content_results.append(result)
-                except (ValueError, ZeroDivisionError) as e:
-                    print(f"Error processing URL {url}: {str(e)}")
-            else:
-                print(f"Skipped analysis for {url} due to empty content.")
-        except requests.RequestException as e:
-            print(f"Failed to fetch {url}: {e}")
+    aggregated = {
+        "pages": extractor.num_documents,
+        "top_entities": [{"entity": entity, "label": label, "pages": count}
+                         for entity, label, count in extractor.top_entities(50)]
+    }
+    with open(os.path.join(main_save_directory, 'named_entities_summary.json'), 'w') as file:
+        json.dump(aggregated, file, indent=2)
+
+    print("Named Entity Analysis completed and saved.")
+    return aggregated
+
+READABILITY_BATCH_SIZE = 64
+
+def prepare_readability_text(text_content):
+    # Remove words that are longer than 100 characters
+    return " ".join(word if len(word) <= 100 else "" for word in text_content.split())
+
+def readability_result(url, readability_score):
+    interpretation, recommendations = interpret_readability(readability_score)
+    return {
+        "url": url,
+        "readability_score": readability_score,
+        "interpretation": interpretation,
+        "recommendations": recommendations
+    }
+
+def readability_batch_task(payloads):
+    """
+    Executor task: score a batch of (url, text) payloads with the process's ReadabilityEngine.
+    Returns a (result, error) pair per payload; result is None with no error for pages without text.
+    """
+    texts = [prepare_readability_text(text_content) for url, text_content in payloads]
+    scorable = [i for i, text in enumerate(texts) if text.strip()]
+    scores = get_engine().score_many([texts[i] for i in scorable])['flesch_score']
+    outcomes = [(None, None)] * len(payloads)
+    for i, readability_score in zip(scorable, scores):
+        if np.isnan(readability_score):
+            outcomes[i] = (None, "no complete sentence or word to score")
+        else:
+            outcomes[i] = (readability_result(payloads[i][0], float(readability_score)), None)
+    return outcomes
+
+def content_analysis_input(sitemap_data, main_save_directory, page_store=None, executor=None, result_store=None):
+    if page_store is None:
+        page_store = PageStore()
+    if executor is None:
+        executor = AnalysisExecutor(max_workers=1)
+    pages = fetch_pages(sitemap_data, page_store, executor)
+
+    # Reuse stored results for pages whose content has not changed and score the rest in the executor
+    results = [page_store.get_analysis(page, 'content_analysis_input') for page in pages]
+    pending = [i for i, result in enumerate(results) if result is None]
+    payloads = [(pages[i].url, pages[i].snapshot().text) for i in pending]
+    batches = [payloads[start:start + READABILITY_BATCH_SIZE]
+               for start in range(0, len(payloads), READABILITY_BATCH_SIZE)]
+    computed = [outcome for batch in executor.map(readability_batch_task, batches) for outcome in batch]
+    for i, (result, error) in zip(pending, computed):
+        if error is not None:
+            print(f"Error processing URL {pages[i].url}: {error}")
+        elif result is None:
+            print(f"Skipped analysis for {pages[i].url} due to empty content.")
+        else:
+            results[i] = result
+            page_store.put_analysis(pages[i], 'content_analysis_input', result)
 
-    # Optionally, you can save the aggregated results to the main directory
-    with open(os.path.join(main_save_directory, 'aggregated_content_analysis_input.json'), 'w') as file:
-        json.dump(content_results, file, indent=2)
+    save_results('content_analysis_input',
+                 ((page.url, result) for page, result in zip(pages, results) if result is not None),
+                 main_save_directory, result_store)
 
     print("Content Analysis Input completed and saved.")
@@ -0,0 +1,130 @@
+# async_crawler.py
+
+import asyncio
+import time
+import aiohttp
+from crawler import Crawler
+from politeness import DEFAULT_CRAWL_DELAY
+from page_store import Page
+import retry_policy
+from retry_policy import CircuitOpenError, is_retryable_exception, is_retryable_status
+
+# aiohttp's counterparts of retry_policy.RETRYABLE_EXCEPTIONS and FATAL_EXCEPTIONS
+RETRYABLE_EXCEPTIONS = (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError)
+FATAL_EXCEPTIONS = (aiohttp.ClientSSLError, aiohttp.InvalidURL)
+
+
+class AsyncCrawler(Crawler):
+    """
+    asyncio drop-in for Crawler with the same crawl()/save_sitemap() contract.
+
+    A single event loop keeps up to max_concurrency requests in flight, at most
+    max_per_host of them against any one host, over one shared keep-alive
+    connection pool. URLs are released by the same PoliteScheduler as in Crawler.
+    HTML parsing and robots.txt loading run in the loop's default thread pool so
+    they do not stall the pending requests.
+
+    It takes Crawler's options, except fetch_executor: fetches run on the event
+    loop, not in a thread pool.
+    """
+
+    def __init__(self, base_url, max_depth=2, max_concurrency=200, max_per_host=20, timeout=30, bloom_capacity=None,
+                 cache_path=None, respect_robots=True, crawl_delay=DEFAULT_CRAWL_DELAY, output_root=None,
+                 fetch_executor=None, robots=None):
+        if fetch_executor is not None:
+            raise TypeError("AsyncCrawler fetches on its event loop and does not take a fetch_executor; "
+                            "limit it with max_concurrency instead")
+        super().__init__(base_url, max_depth=max_depth, max_threads=max_concurrency, timeout=timeout,
+                         bloom_capacity=bloom_capacity, cache_path=cache_path, respect_robots=respect_robots,
+                         crawl_delay=crawl_delay, max_per_host=max_per_host, output_root=output_root, robots=robots)
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+
+    async def fetch_page_async(self, session, url, request_headers):
+        """
+        Fetch url with the same retry policy and circuit breaker as the threaded crawler.
+        Raises CircuitOpenError without sending anything while the host's circuit is open.
+        """
+        policy = retry_policy.default_policy
+        policy.breaker.before_request(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            try:
+                async with session.get(url, headers=request_headers) as response:
+                    text = await response.text(errors='replace')
+                    page = Page(url, status_code=response.status, headers=response.headers, text=text,
+                                elapsed=time.monotonic() - started)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as e:
+                if not is_retryable_exception(e, RETRYABLE_EXCEPTIONS, FATAL_EXCEPTIONS):
+                    policy.breaker.release(url)
+                    return Page.from_error(url, e)
+                if attempt >= policy.max_attempts:
+                    policy.breaker.record_failure(url)
+                    return Page.from_error(url, e)
+                await asyncio.sleep(policy.delay(attempt))
+                continue
+            if not is_retryable_status(page.status_code) or attempt >= policy.max_attempts:
+                policy.breaker.record_status(url, page.status_code)
+                return page
+            await asyncio.sleep(policy.delay(attempt, page.headers))
+
+    async def visit_url_async(self, session, url):
+        loop = asyncio.get_running_loop()
+        if self.robots is not None and not await loop.run_in_executor(None, self.robots.allowed, url):
+            return None
+        request_headers, cached = await loop.run_in_executor(None, self.request_headers, url)
+        page = await self.fetch_page_async(session, url, request_headers)
+        return await loop.run_in_executor(None, self.process_page, page, cached)
+
+    async def crawl_async(self):
+        self.enqueue(self.base_url, 0)
+        connector = aiohttp.TCPConnector(limit=self.max_concurrency, limit_per_host=self.max_per_host)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            in_flight = {}
+            try:
+                while self.scheduler or in_flight or self.deferred:
+                    requeue_in = self.requeue_deferred()
+                    while len(in_flight) < self.max_concurrency:
+                        entry = self.scheduler.pop()
+                        if entry is None:
+                            break
+                        url, depth = entry
+                        in_flight[asyncio.ensure_future(self.visit_url_async(session, url))] = (url, depth)
+
+                    timeout = self.scheduler.wait_time() if len(in_flight) < self.max_concurrency else None
+                    timeout = min((t for t in (timeout, requeue_in) if t is not None), default=None)
+                    if not in_flight:
+                        if timeout is not None:
+                            await asyncio.sleep(timeout)
+                        continue
+                    done, _ = await asyncio.wait(in_flight, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        url, depth = in_flight.pop(task)
+                        self.scheduler.done(url)
+                        try:
+                            links = task.result()
+                        except CircuitOpenError as exc:
+                            self.defer(url, depth, exc)
+                            continue
+                        except Exception as exc:
+                            print(f"{url} generated an exception: {str(exc)}")
+                            # Recorded as a failed page, so the saved sitemap matches this one and nothing refetches it
+                            links = self.process_page(Page.from_error(url, exc))
+                        if links is None:
+                            self.skip(url, depth)
+                            continue
+                        self.complete(url, depth, links)
+            finally:
+                for task in in_flight:
+                    task.cancel()
+                if self.checkpoint is not None:
+                    self.checkpoint.flush()
+
+        self.print_summary()
+        return self.sitemap
+
+    def crawl(self):
+        return asyncio.run(self.crawl_async())
@@ -0,0 +1,100 @@
+# benchmarks/cold_start.py
+#
+# Cold-start cost of seo_analyzer, each sample in a fresh interpreter:
+# `import seo_analyzer`, then the first and a second seo_analysis call.
+# Rank lookups are answered offline unless --with-rank is given, so the
+# numbers measure this code rather than the search engine.
+#
+#   python benchmarks/cold_start.py [--repeat N] [--url URL] [--with-rank]
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.parse_backends import synthetic_page
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import seo_analyzer
+imported = time.perf_counter()
+timings = {'import': imported - started, 'nltk_loaded_on_import': 'nltk' in sys.modules}
+if not WITH_RANK:
+    import serp_rank
+    serp_rank.set_rank_checker(serp_rank.RankChecker(serp_rank.StaticRankProvider()))
+try:
+    started = time.perf_counter()
+    seo_analyzer.seo_analysis(URL)
+    timings['first_call'] = time.perf_counter() - started
+    started = time.perf_counter()
+    seo_analyzer.seo_analysis(URL)
+    timings['second_call'] = time.perf_counter() - started
+except LookupError as error:
+    timings['error'] = str(error)
+print(json.dumps(timings))
+"""
+
+
+class PageHandler(BaseHTTPRequestHandler):
+    body = synthetic_page(50).encode('utf-8')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_child(url, with_rank):
+    code = f"URL = {url!r}\nWITH_RANK = {with_rank!r}\n{CHILD}"
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--url', help="Page to analyze (default: a synthetic page served locally)")
+    parser.add_argument('--with-rank', action='store_true', help="Include the Google rank check")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}/"
+
+    try:
+        samples = [run_child(url, args.with_rank) for _ in range(args.repeat)]
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    print(f"{args.repeat} fresh interpreter(s), nltk imported by 'import seo_analyzer': "
+          f"{any(sample['nltk_loaded_on_import'] for sample in samples)}")
+    for key in ('import', 'first_call', 'second_call'):
+        values = [sample[key] for sample in samples if key in sample]
+        if values:
+            print(f"{key:<12} median {statistics.median(values) * 1000:9.1f} ms   "
+                  f"min {min(values) * 1000:9.1f} ms")
+    errors = {sample['error'] for sample in samples if 'error' in sample}
+    for error in errors:
+        print(f"seo_analysis failed: {error}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# benchmarks/parse_backends.py
+#
+# Per-page parse cost of each PageSnapshot backend, against the BeautifulSoup
+# walks the analysis functions used to make.
+#
+#   python benchmarks/parse_backends.py [--repeat N] [page.html ...]
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from page_snapshot import available_backends, extract_snapshot
+
+
+ALT = " alt='figure'"
+
+
+def synthetic_page(paragraphs=200):
+    body = "".join(
+        f"<section><h2>Section {i}</h2><p>Search engines rank pages by relevance and quality. "
+        f"Paragraph {i} links to <a href='https://example.com/{i}'>page {i}</a>.</p>"
+        f"<img src='/img/{i}.png'{ALT if i % 2 else ''}></section>"
+        for i in range(paragraphs))
+    return ("<html><head><title>Benchmark</title><meta name='description' content='d'>"
+            "<meta name='keywords' content='a, b'><script>var x = 1;</script></head>"
+            f"<body><h1>Benchmark page</h1>{body}</body></html>")
+
+
+def beautifulsoup_walks(url, html):
+    # What one page used to cost across url_optimization_analysis,
+    # content_organization_strategy and the crawler's link extraction
+    soup = BeautifulSoup(html, 'html.parser')
+    soup.title.string if soup.title else None
+    soup.find("meta", attrs={"name": "description"})
+    soup.find_all("meta", attrs={"name": "keywords"})
+    [h1.get_text() for h1 in soup.find_all('h1')]
+    [h.text.strip() for h in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
+    soup.find_all(['section'])
+    soup.find_all('script', {'type': 'application/ld+json'})
+    [a.get('href') for a in soup.find_all('a')]
+    soup.get_text()
+
+
+def time_per_page(extract, pages, repeat):
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for url, html in pages:
+            extract(url, html)
+    return (time.perf_counter() - started) / (repeat * len(pages))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('files', nargs='*', help="HTML files to parse (default: a synthetic page)")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.files:
+        pages = []
+        for path in args.files:
+            with open(path, 'r', encoding='utf-8', errors='replace') as file:
+                pages.append((path, file.read()))
+    else:
+        pages = [("synthetic", synthetic_page())]
+
+    print(f"{len(pages)} page(s), {sum(len(html) for _, html in pages) / len(pages) / 1024:.1f} KiB average")
+    baseline = time_per_page(beautifulsoup_walks, pages, args.repeat)
+    print(f"{'bs4 html.parser (old walks)':<28} {baseline * 1000:8.2f} ms/page")
+    for backend in available_backends():
+        cost = time_per_page(lambda url, html: extract_snapshot(url, html, backend), pages, args.repeat)
+        print(f"{'snapshot ' + backend:<28} {cost * 1000:8.2f} ms/page  ({baseline / cost:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,333 @@
+# benchmarks/suite.py
+#
+# End-to-end benchmark against a generated site served locally (see
+# synthetic_site.py): the crawl, page parsing, the sitemap analysis, keyword
+# extraction, the three analysis stages and seo_analysis. Every stage reports
+# its time, throughput and the process's peak RSS so far; the crawl also
+# reports p50/p95 fetch times and the parse stage p50/p95 parse times.
+#
+# Results are saved as JSON. Given a baseline, the run is compared against it
+# and the script exits with status 1 if any metric got worse by more than
+# --threshold.
+#
+#   python benchmarks/suite.py [--pages N] [--fanout N] [--page-size BYTES] [--latency S]
+#                              [--error-rate P] [--repeat N] [--output FILE] [--baseline FILE]
+#   python benchmarks/suite.py --compare BASELINE CURRENT
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic_site import SyntheticSite
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIRECTORY = os.path.join(REPO, 'benchmarks', 'results')
+
+# Metrics compared between runs, and whether a higher value is better
+METRICS = {
+    'seconds': False,
+    'pages_per_sec': True,
+    'fetch_p50_ms': False,
+    'fetch_p95_ms': False,
+    'parse_p50_ms': False,
+    'parse_p95_ms': False,
+    'call_p50_ms': False,
+    'call_p95_ms': False,
+    'peak_rss_mb': False,
+}
+
+
+def percentile(values, q):
+    """
+    Nearest-rank percentile of values (q in 0..100), or None for no values.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, round(q / 100 * len(ordered)) - 1))]
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(who).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def milliseconds(values):
+    return [value * 1000 for value in values]
+
+
+class Stages:
+    """
+    Runs benchmark stages in order, recording each one's metrics. A stage that
+    raises is recorded with its error and the following stages still run.
+    """
+
+    def __init__(self, quiet=True):
+        self.quiet = quiet
+        self.results = {}
+
+    def run(self, name, func, pages=None):
+        started = time.perf_counter()
+        entry = {}
+        result = None
+        try:
+            with contextlib.redirect_stdout(io.StringIO()) if self.quiet else contextlib.nullcontext():
+                result = func()
+        except Exception as exc:
+            entry['error'] = f"{type(exc).__name__}: {exc}"
+        seconds = time.perf_counter() - started
+        entry['seconds'] = round(seconds, 4)
+        if pages and 'error' not in entry:
+            entry['pages'] = pages
+            entry['pages_per_sec'] = round(pages / seconds, 2) if seconds else None
+        entry['peak_rss_mb'] = peak_rss_mb()
+        self.results[name] = entry
+        return result
+
+    def add(self, name, **metrics):
+        self.results.setdefault(name, {}).update(
+            {key: round(value, 3) if isinstance(value, float) else value for key, value in metrics.items()})
+
+
+def run_once(url, args, workdir):
+    from crawler import Crawler
+    from page_snapshot import extract_snapshot
+    from analysis_executor import AnalysisExecutor
+    from result_store import open_result_store
+    from sitemap_visualizations import analyze_sitemap
+    from analysis_functions import extract_keywords, url_optimization_analysis, content_organization_strategy, \
+        content_analysis_input
+    import retry_policy
+    import seo_analyzer
+    import serp_rank
+
+    stages = Stages(quiet=not args.verbose)
+    crawler = Crawler(url, max_depth=args.depth, max_threads=args.threads, crawl_delay=0, max_per_host=args.threads,
+                      output_root=workdir)
+    sitemap = stages.run('crawl', crawler.crawl) or {}
+    pages = [crawler.page_store.get(page_url) for page_url in sitemap]
+    pages = [page for page in pages if page is not None]
+    crawl_seconds = stages.results['crawl']['seconds']
+    stages.add('crawl', pages=len(pages), pages_per_sec=round(len(pages) / crawl_seconds, 2) if crawl_seconds else None)
+    fetch_times = milliseconds(page.elapsed for page in pages)
+    stages.add('crawl', fetch_p50_ms=percentile(fetch_times, 50), fetch_p95_ms=percentile(fetch_times, 95),
+               errors=sum(1 for page in pages if not page.ok),
+               circuit_open=sum(1 for page in pages if page.error and 'Circuit open' in page.error))
+
+    ok_pages = [(page.url, page.text) for page in pages if page.ok]
+    parse_times = []
+
+    def parse_all():
+        for page_url, html in ok_pages:
+            started = time.perf_counter()
+            extract_snapshot(page_url, html)
+            parse_times.append(time.perf_counter() - started)
+
+    stages.run('parse', parse_all, pages=len(ok_pages))
+    stages.add('parse', parse_p50_ms=percentile(milliseconds(parse_times), 50),
+               parse_p95_ms=percentile(milliseconds(parse_times), 95))
+
+    sitemap_path = stages.run('save_sitemap', lambda: crawler.save_sitemap(export_json=False))
+    if sitemap_path:
+        stages.run('analyze_sitemap', lambda: analyze_sitemap(sitemap_path), pages=len(sitemap))
+
+    save_directory = os.path.join(workdir, 'analysis')
+    os.makedirs(save_directory, exist_ok=True)
+    result_store = open_result_store(os.path.join(save_directory, 'results.db'))
+    with AnalysisExecutor(max_workers=args.workers) as executor:
+        keywords = stages.run('extract_keywords', lambda: extract_keywords(sitemap, crawler.page_store, executor),
+                              pages=len(sitemap)) or []
+        for name, stage in (
+                ('url_optimization_analysis', lambda: url_optimization_analysis(
+                    sitemap, keywords, save_directory, crawler.page_store, executor, result_store)),
+                ('content_organization_strategy', lambda: content_organization_strategy(
+                    sitemap, save_directory, crawler.page_store, executor, result_store)),
+                ('content_analysis_input', lambda: content_analysis_input(
+                    sitemap, save_directory, crawler.page_store, executor, result_store))):
+            stages.run(name, stage, pages=len(sitemap))
+    result_store.close()
+
+    if not args.with_rank:
+        serp_rank.set_rank_checker(serp_rank.RankChecker(serp_rank.StaticRankProvider()))
+    # The site's error pages may have opened the host's circuit during the crawl
+    retry_policy.default_policy.breaker.record_success(url)
+    sample = [page_url for page_url, html in ok_pages[:args.seo_pages]]
+    call_times = []
+    unreachable = []
+
+    def analyze_sample():
+        for page_url in sample:
+            started = time.perf_counter()
+            results = seo_analyzer.seo_analysis(page_url)
+            call_times.append(time.perf_counter() - started)
+            if "Error: Unable to access the website." in results['bad']:
+                unreachable.append(page_url)
+
+    stages.run('seo_analysis', analyze_sample, pages=len(sample))
+    stages.add('seo_analysis', call_p50_ms=percentile(milliseconds(call_times), 50),
+               call_p95_ms=percentile(milliseconds(call_times), 95), unreachable=len(unreachable))
+    return stages.results
+
+
+def median_results(runs):
+    """
+    Per-stage, per-metric medians over several runs; errors are taken from the first run that had one.
+    """
+    merged = {}
+    for stage in runs[0]:
+        entries = [run[stage] for run in runs if stage in run]
+        merged[stage] = {}
+        for key in entries[0]:
+            values = [entry[key] for entry in entries if entry.get(key) is not None]
+            if values and all(isinstance(value, (int, float)) for value in values):
+                merged[stage][key] = round(statistics.median(values), 4)
+            else:
+                merged[stage][key] = entries[0][key]
+        for entry in entries:
+            if 'error' in entry:
+                merged[stage]['error'] = entry['error']
+                break
+    return merged
+
+
+def git_commit():
+    try:
+        output = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO, capture_output=True, text=True,
+                                check=True)
+        return output.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_suite(args):
+    config = {key: getattr(args, key) for key in ('pages', 'fanout', 'page_size', 'latency', 'error_rate', 'seed',
+                                                  'depth', 'threads', 'workers', 'seo_pages', 'with_rank', 'repeat')}
+    site = SyntheticSite(args.pages, args.fanout, args.page_size, args.latency, args.error_rate, args.seed)
+    server, url = site.serve_in_process()
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            workdir = tempfile.mkdtemp(prefix='seo-bench-')
+            try:
+                runs.append(run_once(url, args, workdir))
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        children_rss = peak_rss_mb(resource.RUSAGE_CHILDREN)
+    finally:
+        server.terminate()
+    return {
+        'created': datetime.datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'config': config,
+        'peak_rss_children_mb': children_rss,
+        'stages': median_results(runs),
+    }
+
+
+def compare(baseline, current, threshold):
+    """
+    [(stage, metric, baseline value, current value, relative change, regressed)] for every
+    metric both runs have, skipping stages that failed in either; a metric regressed if it
+    got worse by more than threshold.
+    """
+    rows = []
+    for stage, entry in current['stages'].items():
+        old_entry = baseline['stages'].get(stage, {})
+        if 'error' in entry or 'error' in old_entry:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old, new = old_entry.get(metric), entry.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            rows.append((stage, metric, old, new, change, worse > threshold))
+    return rows
+
+
+def print_results(results):
+    print(f"commit {results['commit']}, {results['config']['pages']} pages, repeat {results['config']['repeat']}")
+    for stage, entry in results['stages'].items():
+        metrics = "  ".join(f"{key}={value}" for key, value in entry.items() if key != 'error')
+        print(f"{stage:<30} {metrics}")
+        if 'error' in entry:
+            print(f"{'':<30} failed: {entry['error']}")
+
+
+def print_comparison(baseline, current, threshold):
+    if baseline['config'] != current['config']:
+        print("Warning: the runs used different settings; differences may not be regressions")
+    rows = compare(baseline, current, threshold)
+    regressions = [row for row in rows if row[5]]
+    for stage, metric, old, new, change, regressed in rows:
+        flag = "  REGRESSION" if regressed else ""
+        print(f"{stage:<30} {metric:<14} {old:>12} -> {new:<12} {change:+7.1%}{flag}")
+    print(f"{len(regressions)} regression(s) beyond {threshold:.0%} against commit {baseline.get('commit')}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the crawl and analysis pipeline on a local site.")
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=20000, help="Approximate bytes per page")
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds the server waits before each response")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Share of pages that answer 500")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--depth', type=int, default=10)
+    parser.add_argument('--threads', type=int, default=10, help="Crawler fetch threads")
+    parser.add_argument('--workers', type=int, default=None, help="Analysis worker processes")
+    parser.add_argument('--seo-pages', type=int, default=20, help="Pages run through seo_analysis")
+    parser.add_argument('--with-rank', action='store_true', help="Include the Google rank check in seo_analysis")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs to take each metric's median over")
+    parser.add_argument('--output', help="Where to save the results (default: benchmarks/results/<time>.json)")
+    parser.add_argument('--baseline', help="Earlier results to compare this run against")
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'),
+                        help="Only compare two saved results")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="Relative change counted as a regression (default: 0.10)")
+    parser.add_argument('--verbose', action='store_true', help="Show the stages' own output")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as file:
+            baseline = json.load(file)
+        with open(args.compare[1]) as file:
+            current = json.load(file)
+        sys.exit(1 if print_comparison(baseline, current, args.threshold) else 0)
+
+    results = run_suite(args)
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        output = os.path.join(RESULTS_DIRECTORY, f"suite-{results['created'].replace(':', '')}.json")
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print_results(results)
+    print(f"Results saved to: {output}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        sys.exit(1 if print_comparison(baseline, results, args.threshold) else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+# benchmarks/synthetic_site.py
+#
+# A generated website served from a local HTTP server, for benchmarks and
+# crawl tests that must not depend on the network. The same settings and seed
+# always produce the same pages and links.
+#
+#   python benchmarks/synthetic_site.py [--pages N] [--fanout N] [--page-size BYTES]
+#                                       [--latency SECONDS] [--error-rate P] [--port PORT]
+
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("search engine ranking content keyword page site link optimization traffic organic "
+         "marketing strategy audience quality relevance index crawl structure heading title "
+         "description schema markup mobile speed performance analytics conversion visitor "
+         "article blog product service customer review local business authority backlink "
+         "domain navigation sitemap canonical redirect image video query intent snippet").split()
+
+ALT = " alt='figure'"
+
+
+class SyntheticSite:
+    """
+    pages pages at /, /page/1 ... /page/<pages - 1>, each linking to fanout others.
+
+    Page bodies are about page_size bytes of headings and paragraphs whose
+    words follow a Zipf-like distribution, so keyword and readability stages
+    see realistic text. Every response is delayed by latency seconds, and a
+    fixed error_rate share of the pages (chosen by a hash of the path, so the
+    same ones on every run) answers 500. Page i's links always include page
+    i + 1, so every page is reachable from /.
+    """
+
+    def __init__(self, pages=200, fanout=10, page_size=20000, latency=0.0, error_rate=0.0, seed=0):
+        self.pages = pages
+        self.fanout = fanout
+        self.page_size = page_size
+        self.latency = latency
+        self.error_rate = error_rate
+        self.seed = seed
+        self._weights = [1.0 / rank for rank in range(1, len(WORDS) + 1)]
+        self._cache = {}
+
+    @staticmethod
+    def path(index):
+        return '/' if index == 0 else f'/page/{index}'
+
+    def index_of(self, path):
+        if path == '/':
+            return 0
+        if path.startswith('/page/') and path[6:].isdigit() and 0 < int(path[6:]) < self.pages:
+            return int(path[6:])
+        return None
+
+    def fails(self, index):
+        return index != 0 and zlib.crc32(f'{self.seed}:{index}'.encode()) % 10000 < self.error_rate * 10000
+
+    def links(self, index):
+        rng = random.Random(self.seed * 1000003 + index)
+        targets = {(index + 1) % self.pages}
+        while len(targets) < min(self.fanout, self.pages - 1):
+            targets.add(rng.randrange(self.pages))
+        targets.discard(index)
+        return sorted(targets)
+
+    def html(self, index, origin=''):
+        """
+        Page index's HTML; links are absolute when origin (e.g. 'http://127.0.0.1:8000') is given.
+        """
+        page = self._cache.get((index, origin))
+        if page is not None:
+            return page
+        rng = random.Random(self.seed * 7919 + index)
+        links = "".join(f"<li><a href='{origin}{self.path(target)}'>Page {target}</a></li>"
+                        for target in self.links(index))
+        parts = [f"<html><head><title>Page {index} | Synthetic site</title>",
+                 f"<meta name='description' content='Synthetic page {index} for benchmarks'>",
+                 "<meta name='keywords' content='seo, benchmark'></head><body>",
+                 f"<h1>Page {index}</h1><nav><ul>{links}</ul></nav>"]
+        size = sum(len(part) for part in parts)
+        section = 0
+        while size < self.page_size:
+            section += 1
+            sentences = " ".join(
+                " ".join(rng.choices(WORDS, self._weights, k=rng.randint(8, 20))).capitalize() + "."
+                for _ in range(rng.randint(3, 6)))
+            block = (f"<section><h2>Section {section}</h2><p>{sentences}</p>"
+                     f"<img src='/img/{index}-{section}.png'{ALT if section % 2 else ''}></section>")
+            parts.append(block)
+            size += len(block)
+        parts.append("</body></html>")
+        page = "".join(parts)
+        self._cache[(index, origin)] = page
+        return page
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if site.latency:
+                    time.sleep(site.latency)
+                index = site.index_of(self.path)
+                if index is None:
+                    self.respond(404, b"Not found")
+                elif site.fails(index):
+                    self.respond(500, b"Server error")
+                else:
+                    # The crawler follows absolute links only
+                    origin = f"http://{self.headers.get('Host') or '127.0.0.1:%d' % self.server.server_address[1]}"
+                    self.respond(200, site.html(index, origin).encode('utf-8'))
+
+            def respond(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/html; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def serve(self, port=0):
+        """
+        Start serving on 127.0.0.1 in a background thread; returns the server.
+        Its base URL is url_of(server); stop it with server.shutdown().
+        """
+        server = ThreadingHTTPServer(('127.0.0.1', port), self.handler())
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+    @staticmethod
+    def url_of(server):
+        return f"http://127.0.0.1:{server.server_address[1]}/"
+
+    def serve_in_process(self, port=0):
+        """
+        Serve from a separate process, so generating and sending pages takes no CPU
+        time or memory from the process being measured. Returns (process, base URL);
+        stop it with process.terminate().
+        """
+        parent, child = multiprocessing.Pipe()
+        process = multiprocessing.Process(target=_serve_forever, args=(self, port, child), daemon=True)
+        process.start()
+        url = parent.recv()
+        return process, url
+
+
+def _serve_forever(site, port, connection):
+    server = site.serve(port)
+    connection.send(SyntheticSite.url_of(server))
+    threading.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a generated website locally.")
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--fanout', type=int, default=10)
+    parser.add_argument('--page-size', type=int, default=20000)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--port', type=int, default=8000)
+    args = parser.parse_args()
+
+    site = SyntheticSite(args.pages, args.fanout, args.page_size, args.latency, args.error_rate, args.seed)
+    server = site.serve(args.port)
+    print(f"Serving {args.pages} pages at {SyntheticSite.url_of(server)} (Ctrl-C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
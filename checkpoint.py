@@ -0,0 +1,149 @@
+# checkpoint.py
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from page_store import Page
+
+
+class CrawlCheckpoint:
+    """
+    SQLite log of crawl progress that lets an interrupted crawl resume where it stopped.
+
+    Every URL is written once when it is enqueued and updated once when its page
+    completes, so the frontier is always "enqueued but not done" and checkpoints
+    only write what changed since the previous one. Completed pages are stored
+    with their bodies so a resumed run never refetches them. URLs that were
+    skipped (disallowed by robots.txt, or on a host whose robots.txt could not
+    be fetched) are marked with the reason, so a resumed run neither fetches
+    them nor puts them in the sitemap.
+    """
+
+    def __init__(self, path, interval=30):
+        self.path = path
+        self.interval = interval
+        self.lock = threading.Lock()
+        self._enqueued = []
+        self._completed = []
+        self._skipped = []
+        self._last_flush = time.monotonic()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                depth INTEGER,
+                done INTEGER DEFAULT 0,
+                links TEXT,
+                skipped TEXT
+            )""")
+        # Checkpoints written before skipped URLs were told apart lack the column
+        if 'skipped' not in [row[1] for row in self.conn.execute("PRAGMA table_info(urls)")]:
+            self.conn.execute("ALTER TABLE urls ADD COLUMN skipped TEXT")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                status_code INTEGER,
+                headers TEXT,
+                body BLOB,
+                elapsed REAL,
+                error TEXT
+            )""")
+        self.conn.commit()
+
+    def clear(self):
+        """
+        Forget everything recorded, in the file and in memory, so a new crawl starts from scratch.
+        """
+        with self.lock:
+            self._enqueued = []
+            self._completed = []
+            self._skipped = []
+            with self.conn:
+                self.conn.execute("DELETE FROM urls")
+                self.conn.execute("DELETE FROM pages")
+                self.conn.execute("DELETE FROM meta")
+
+    def set_meta(self, **values):
+        with self.lock:
+            self.conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                                  [(key, json.dumps(value)) for key, value in values.items()])
+            self.conn.commit()
+
+    def get_meta(self):
+        with self.lock:
+            return {key: json.loads(value) for key, value in self.conn.execute("SELECT key, value FROM meta")}
+
+    def record_enqueued(self, url, depth):
+        with self.lock:
+            self._enqueued.append((url, depth))
+
+    def record_completed(self, url, links, page):
+        with self.lock:
+            self._completed.append((url, links, page))
+
+    def record_skipped(self, url, reason):
+        """
+        Mark url as not fetched, for reason ('disallowed' or 'unreachable').
+        """
+        with self.lock:
+            self._skipped.append((reason, url))
+
+    def due(self):
+        return time.monotonic() - self._last_flush >= self.interval
+
+    def flush(self):
+        """
+        Write everything recorded since the last flush in a single transaction.
+        """
+        with self.lock:
+            enqueued, self._enqueued = self._enqueued, []
+            completed, self._completed = self._completed, []
+            skipped, self._skipped = self._skipped, []
+            with self.conn:
+                # A URL found again closer to the start keeps the shallower depth
+                self.conn.executemany("INSERT INTO urls (url, depth) VALUES (?, ?) "
+                                      "ON CONFLICT(url) DO UPDATE SET depth = MIN(depth, excluded.depth)", enqueued)
+                self.conn.executemany("UPDATE urls SET done = 1, links = ? WHERE url = ?",
+                                      [(json.dumps(links), url) for url, links, page in completed])
+                self.conn.executemany("UPDATE urls SET done = 1, skipped = ? WHERE url = ?", skipped)
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+                    [(page.url, page.status_code, json.dumps(dict(page.headers)),
+                      zlib.compress(page.text.encode('utf-8')), page.elapsed, page.error)
+                     for url, links, page in completed if page is not None])
+            self._last_flush = time.monotonic()
+
+    def iter_urls(self):
+        """
+        Yield (url, depth, done, links) for every URL recorded so far, except skipped ones.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, depth, done, links FROM urls WHERE skipped IS NULL ORDER BY rowid").fetchall()
+        for url, depth, done, links in rows:
+            yield url, depth, bool(done), json.loads(links) if links else []
+
+    def iter_skipped(self):
+        """
+        Yield (url, reason) for every skipped URL.
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT url, skipped FROM urls WHERE skipped IS NOT NULL ORDER BY rowid").fetchall()
+        yield from rows
+
+    def iter_pages(self):
+        with self.lock:
+            rows = self.conn.execute("SELECT url, status_code, headers, body, elapsed, error FROM pages").fetchall()
+        for url, status_code, headers, body, elapsed, error in rows:
+            yield Page(url, status_code=status_code, headers=json.loads(headers),
+                       text=zlib.decompress(body).decode('utf-8'), elapsed=elapsed, error=error)
+
+    def close(self):
+        self.flush()
+        with self.lock:
+            self.conn.close()
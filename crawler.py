@@ -1,75 +1,402 @@
 # crawler.py
 
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import heapq
 import requests
-from bs4 import BeautifulSoup
+import http_client
+import retry_policy
 import threading
+import time
 import os
-import json
 from urls_utils import headers, sanitize_url_for_directory
+from page_store import Page, PageStore
+from frontier import Frontier, SeenSet, BloomFilter, canonicalize_url
+from http_cache import HttpCache
+from checkpoint import CrawlCheckpoint
+from sitemap_io import SitemapWriter, write_sitemap_jsonl, export_sitemap_json
+from politeness import DEFAULT_CRAWL_DELAY, PoliteScheduler, RobotsCache
 
+# Times a URL is put back while its host's circuit is open before it is recorded as failed
+CIRCUIT_RETRIES = 3
 
 
 class Crawler:
-    def __init__(self, base_url, max_depth=2, max_threads=10, timeout=30):
-        self.base_url = self.format_url(base_url)
+    def __init__(self, base_url, max_depth=2, max_threads=10, timeout=30, bloom_capacity=None, cache_path=None,
+                 respect_robots=True, crawl_delay=DEFAULT_CRAWL_DELAY, max_per_host=2, output_root=None,
+                 fetch_executor=None, robots=None):
+        self.base_url = canonicalize_url(self.format_url(base_url))
         self.max_depth = max_depth
         self.max_threads = max_threads
         self.timeout = timeout
-        self.visited_urls = []
+        # Where the save directory is created (default: the working directory)
+        self.output_root = output_root
+        # A thread pool shared by several crawlers; it bounds their fetches in flight together
+        self.fetch_executor = fetch_executor
+        # An exact set by default; a fixed-size Bloom filter for crawls too large to hold every URL.
+        # It bounds only the seen-set: the sitemap below still keeps every crawled URL and its
+        # links, because the analyses and summaries read it, so memory still grows with the crawl
+        self.visited_urls = BloomFilter(bloom_capacity) if bloom_capacity else SeenSet()
         self.sitemap = {}
+        # Shallowest depth each URL has been found at, and the URLs whose links have been queued
+        self.depths = {}
+        self.expanded = set()
+        # With a cache, recrawls send conditional requests and reuse unchanged pages
+        self.http_cache = HttpCache(cache_path) if cache_path else None
+        self.page_store = PageStore(timeout=timeout, cache=self.http_cache)
+        self.frontier = Frontier()
+        # URLs reach the fetchers through the scheduler, which enforces robots.txt and per-host rates
+        self.robots = (robots or RobotsCache(timeout=timeout)) if respect_robots else None
+        self.scheduler = PoliteScheduler(self.frontier, self.robots, default_delay=crawl_delay,
+                                         max_per_host=max_per_host, on_disallowed=self.skip)
         self.lock = threading.Lock()
+        self.skipped = 0
+        self.unreachable = 0  # URLs skipped because their robots.txt could not be fetched
+        # URLs put back while their host's circuit was open: a heap of (time to retry, url, depth)
+        self.deferred = []
+        self.deferrals = {}  # url -> times deferred
+        self.checkpoint = None
+        self.sitemap_writer = None
         self.main_save_directory = ""
 
     @staticmethod
     def format_url(url):
         if not url.startswith('http'):
             try:
-                requests.head('https://' + url, timeout=5, headers=headers)
+                http_client.head('https://' + url, timeout=5, headers=headers)
                 return 'https://' + url
             except requests.RequestException:
                 return 'http://' + url
         return url
 
-    def visit_url(self, url, depth):
+    def get_save_directory(self):
+        return os.path.join(self.output_root or os.getcwd(), sanitize_url_for_directory(self.base_url))
+
+    def enable_checkpoint(self, path=None, interval=30, resume=False):
+        """
+        Periodically checkpoint the crawl to an SQLite file (by default in the save directory).
+        With resume=True, state from an earlier run at that path is restored first; otherwise
+        anything left there by an earlier run is discarded. Raises ValueError when resuming
+        from a checkpoint of a crawl that started at another URL.
+        """
+        if path is None:
+            os.makedirs(self.get_save_directory(), exist_ok=True)
+            path = os.path.join(self.get_save_directory(), 'crawl_checkpoint.db')
+        self.checkpoint = CrawlCheckpoint(path, interval=interval)
+        if resume:
+            base_url = self.checkpoint.get_meta().get('base_url')
+            if base_url is not None and base_url != self.base_url:
+                self.checkpoint.close()
+                self.checkpoint = None
+                raise ValueError(f"Checkpoint {path} is for a crawl of {base_url}, not {self.base_url}")
+            self.restore_checkpoint()
+        else:
+            self.checkpoint.clear()
+        self.checkpoint.set_meta(base_url=self.base_url, max_depth=self.max_depth)
+        return path
+
+    def enable_cache(self, path=None):
+        """
+        Keep crawled pages in a persistent HttpCache (by default in the save directory),
+        so the next crawl of the site requests them conditionally.
+        """
+        if path is None:
+            os.makedirs(self.get_save_directory(), exist_ok=True)
+            path = os.path.join(self.get_save_directory(), 'http_cache.db')
+        self.http_cache = HttpCache(path)
+        self.page_store.cache = self.http_cache
+        return path
+
+    def enable_sitemap_stream(self, path=None):
+        """
+        Write each page's sitemap record to a JSON Lines file as soon as the page completes.
+        Call after enable_checkpoint when resuming, so pages finished earlier are written too.
+        """
+        if path is None:
+            os.makedirs(self.get_save_directory(), exist_ok=True)
+            path = os.path.join(self.get_save_directory(), 'sitemap.jsonl')
+        self.sitemap_writer = SitemapWriter(path)
+        if self.checkpoint is not None:
+            for url, depth, done, links in self.checkpoint.iter_urls():
+                if done:
+                    self.sitemap_writer.write(url, links)
+        return path
+
+    def restore_checkpoint(self):
+        meta = self.checkpoint.get_meta()
+        if meta.get('max_depth') is not None and meta['max_depth'] != self.max_depth:
+            print(f"Resuming with the checkpoint's max depth of {meta['max_depth']}")
+            self.max_depth = meta['max_depth']
+        completed = 0
+        for url, depth, done, links in self.checkpoint.iter_urls():
+            self.visited_urls.add(url)
+            self.sitemap[url] = links
+            self.depths[url] = depth
+            if done:
+                self.expanded.add(url)
+                completed += 1
+            else:
+                self.frontier.push(url, depth)
+        # Skipped URLs stay out of the sitemap, so nothing fetches them later
+        for url, reason in self.checkpoint.iter_skipped():
+            self.visited_urls.add(url)
+            if reason == 'unreachable':
+                self.unreachable += 1
+            else:
+                self.skipped += 1
+        for page in self.checkpoint.iter_pages():
+            self.page_store.add(page)
+        print(f"Resumed {completed} completed pages and {len(self.frontier)} queued URLs")
+
+    def update_depth(self, url, depth):
+        """
+        Record that url was found at depth. Returns 'new' for a URL not seen before, 'shallower'
+        if it was only seen deeper so far, or None if it is too deep or was seen at depth or above.
+        """
+        if depth >= self.max_depth:
+            return None
         with self.lock:
-            if depth >= self.max_depth or url in self.visited_urls:
-                return
-            self.visited_urls.append(url)
-            self.sitemap[url] = []
+            known = self.depths.get(url)
+            if known is None:
+                if not self.visited_urls.add(url):
+                    return None
+            elif known <= depth:
+                return None
+            self.depths[url] = depth
+        return 'new' if known is None else 'shallower'
 
-        try:
-            response = requests.get(url, timeout=self.timeout, headers=headers)
-            response.raise_for_status()
-        except (requests.RequestException, ValueError):
+    def enqueue(self, url, depth):
+        """
+        Add url to the frontier unless it is too deep or has already been seen at depth or above.
+
+        Fetches finish out of order, so a URL may first be found through a deep page
+        and later through a shallower one. It then counts at the shallower depth: a
+        queued URL completes at it, and a completed one has its links queued again
+        one level below it, so the crawl reaches what a breadth-first crawl would.
+        """
+        found = self.update_depth(url, depth)
+        if found is None:
+            return
+        if self.checkpoint is not None:
+            self.checkpoint.record_enqueued(url, depth)
+        if found == 'new':
+            with self.lock:
+                self.sitemap[url] = []
+            self.frontier.push(url, depth)
             return
+        with self.lock:
+            links = list(self.sitemap.get(url, ())) if url in self.expanded else []
+        for link in links:
+            self.enqueue(link, depth + 1)
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        self.sitemap[url] = [link.get('href') for link in soup.find_all('a') if
-                             link.get('href') and link.get('href').startswith('http')]
+    def complete(self, url, depth, links):
+        """
+        Record a finished page and queue its links one level deeper.
+        """
+        with self.lock:
+            # It may have been found at a shallower depth while it was queued
+            depth = self.depths.get(url, depth)
+            self.expanded.add(url)
+        if self.checkpoint is not None:
+            self.checkpoint.record_completed(url, links, self.page_store.get(url))
+        if self.sitemap_writer is not None:
+            self.sitemap_writer.write(url, links)
+        for link in links:
+            self.enqueue(link, depth + 1)
+        if self.checkpoint is not None and self.checkpoint.due():
+            self.checkpoint.flush()
 
-        for link in self.sitemap[url]:
-            self.visit_url(link, depth + 1)
+    def skip(self, url, depth):
+        """
+        Drop a queued URL that robots.txt disallows: it is not fetched and leaves the sitemap.
+        URLs disallowed only because robots.txt could not be fetched are counted as unreachable.
+        """
+        unreachable = self.robots is not None and self.robots.unreachable(url)
+        with self.lock:
+            self.sitemap.pop(url, None)
+            if unreachable:
+                self.unreachable += 1
+            else:
+                self.skipped += 1
+        if self.checkpoint is not None:
+            self.checkpoint.record_skipped(url, 'unreachable' if unreachable else 'disallowed')
 
-    def crawl(self):
-        with ThreadPoolExecutor(max_workers=self.max_threads) as executor:
-            future_to_url = {executor.submit(self.visit_url, url, 0): url for url in [self.base_url]}
-            for future in as_completed(future_to_url):
-                url = future_to_url[future]
+    def defer(self, url, depth, exc):
+        """
+        Put back a URL that was not fetched because its host's circuit was open, to be tried
+        again once the circuit may close. After CIRCUIT_RETRIES tries it is recorded as failed.
+        """
+        tries = self.deferrals.get(url, 0) + 1
+        if tries > CIRCUIT_RETRIES:
+            self.complete(url, depth, self.process_page(Page.from_error(url, exc)))
+            return
+        self.deferrals[url] = tries
+        retry_at = time.monotonic() + retry_policy.default_policy.breaker.reset_timeout
+        with self.lock:
+            heapq.heappush(self.deferred, (retry_at, url, depth))
+
+    def requeue_deferred(self):
+        """
+        Move deferred URLs that are due back to the frontier.
+        Returns seconds until the next one is due, or None if none is waiting.
+        """
+        now = time.monotonic()
+        with self.lock:
+            while self.deferred and self.deferred[0][0] <= now:
+                _, url, depth = heapq.heappop(self.deferred)
+                self.frontier.push(url, depth)
+            return max(0.0, self.deferred[0][0] - now) if self.deferred else None
+
+    def request_headers(self, url):
+        """
+        Return the headers to fetch url with and its cache entry, if any.
+        Cached pages are requested conditionally so unchanged ones come back as 304.
+        """
+        cached = self.http_cache.get(url) if self.http_cache is not None else None
+        request_headers = dict(headers)
+        if cached is not None:
+            request_headers.update(cached.conditional_headers())
+        return request_headers, cached
+
+    def visit_url(self, url):
+        """
+        Fetch url, record it in the page store and return the absolute links found on it.
+        Returns None without fetching if robots.txt disallows url, and raises
+        CircuitOpenError if url's host is failing and was not asked.
+        """
+        if self.robots is not None and not self.robots.allowed(url):
+            return None
+        request_headers, cached = self.request_headers(url)
+        try:
+            response = retry_policy.get(url, timeout=self.timeout, headers=request_headers)
+            page = Page.from_response(url, response)
+        except retry_policy.CircuitOpenError:
+            raise
+        except (requests.RequestException, ValueError) as e:
+            page = Page.from_error(url, e)
+        return self.process_page(page, cached)
+
+    def process_page(self, page, cached=None):
+        """
+        Store a fetched page, record its outgoing links in the sitemap and return them.
+        A 304 for a cached page reuses the cached body and links.
+        """
+        if cached is not None and page.status_code == 304:
+            self.http_cache.record_hit()
+            self.page_store.add(cached.to_page(elapsed=page.elapsed))
+            with self.lock:
+                self.sitemap[page.url] = cached.links
+            return cached.links
+
+        if self.http_cache is not None:
+            self.http_cache.record_miss()
+        self.page_store.add(page)
+        if not page.ok:
+            return []
+
+        links = []
+        for href in page.snapshot().links:
+            if href.startswith('http'):
                 try:
-                    future.result()
-                except Exception as exc:
-                    print(f"{url} generated an exception: {str(exc)}")
-                else:
-                    print(f"{url} page is {len(self.sitemap[url])} links long")
-            return self.sitemap
-
-    def save_sitemap(self):
-        folder_name = sanitize_url_for_directory(self.base_url)
-        self.main_save_directory = os.path.join(os.getcwd(), folder_name)
+                    links.append(canonicalize_url(href))
+                except ValueError:
+                    continue
+        with self.lock:
+            self.sitemap[page.url] = links
+        if self.http_cache is not None and page.status_code == 200:
+            self.http_cache.put(page, links)
+        return links
+
+    def crawl(self):
+        """
+        Crawl from base_url, keeping up to max_threads fetches in flight.
+
+        This thread owns the frontier: it hands URLs to the pool as the scheduler
+        releases them, queues the links each finished page yields one level
+        deeper, and stops once the frontier is empty and no fetch is still running.
+        URLs whose host's circuit breaker is open are put back and tried again later.
+        With a shared fetch_executor, at most max_threads of its threads work for this crawl.
+        """
+        self.enqueue(self.base_url, 0)
+        self.run()
+        self.print_summary()
+        return self.sitemap
+
+    def run(self):
+        """
+        Fetch until the frontier is empty and no fetch is still running or deferred.
+        """
+        executor = self.fetch_executor or ThreadPoolExecutor(max_workers=self.max_threads)
+        in_flight = {}
+        try:
+            while self.scheduler or in_flight or self.deferred:
+                requeue_in = self.requeue_deferred()
+                while len(in_flight) < self.max_threads:
+                    entry = self.scheduler.pop()
+                    if entry is None:
+                        break
+                    url, depth = entry
+                    in_flight[executor.submit(self.visit_url, url)] = (url, depth)
+
+                # With free fetch slots, wake up when the next host's delay has passed
+                timeout = self.scheduler.wait_time() if len(in_flight) < self.max_threads else None
+                timeout = min((t for t in (timeout, requeue_in) if t is not None), default=None)
+                if not in_flight:
+                    if timeout is not None:
+                        time.sleep(timeout)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    self.scheduler.done(url)
+                    try:
+                        links = future.result()
+                    except retry_policy.CircuitOpenError as exc:
+                        self.defer(url, depth, exc)
+                        continue
+                    except Exception as exc:
+                        print(f"{url} generated an exception: {str(exc)}")
+                        # Recorded as a failed page, so the saved sitemap matches this one and nothing refetches it
+                        links = self.process_page(Page.from_error(url, exc))
+                    if links is None:
+                        self.skip(url, depth)
+                        continue
+                    self.complete(url, depth, links)
+        finally:
+            # On Ctrl-C, keep what has completed; in-flight pages are still queued in the checkpoint
+            if executor is self.fetch_executor:
+                for future in in_flight:
+                    future.cancel()
+            else:
+                executor.shutdown(wait=False, cancel_futures=True)
+            if self.checkpoint is not None:
+                self.checkpoint.flush()
+
+    def print_summary(self):
+        print(f"{self.base_url} page is {len(self.sitemap.get(self.base_url, []))} links long")
+        print(f"Crawled {len(self.sitemap)} pages")
+        if self.skipped:
+            print(f"Skipped {self.skipped} URLs disallowed by robots.txt")
+        if self.unreachable:
+            print(f"Skipped {self.unreachable} URLs on hosts whose robots.txt could not be fetched")
+        if self.http_cache is not None:
+            report = self.http_cache.report()
+            print(f"Cache: {report['hits']} unchanged, {report['misses']} fetched, "
+                  f"hit rate {report['hit_rate']:.1%}")
+
+    def save_sitemap(self, export_json=True):
+        """
+        Save the sitemap as sitemap.jsonl in the save directory and, unless export_json
+        is False, also as sitemap.json. Returns the path of the last file written.
+        """
+        self.main_save_directory = self.get_save_directory()
         os.makedirs(self.main_save_directory, exist_ok=True)
-        valid_filepath = os.path.join(self.main_save_directory, 'sitemap.json')
-        with open(valid_filepath, 'w') as file:
-            file.write(json.dumps(self.sitemap, indent=2))
+        if self.sitemap_writer is not None:
+            self.sitemap_writer.close()
+            valid_filepath = self.sitemap_writer.path
+        else:
+            valid_filepath = os.path.join(self.main_save_directory, 'sitemap.jsonl')
+            write_sitemap_jsonl(self.sitemap, valid_filepath)
+        if export_json:
+            valid_filepath = export_sitemap_json(valid_filepath, os.path.join(self.main_save_directory, 'sitemap.json'))
         print(f"Sitemap saved to: {valid_filepath}")
         return valid_filepath
@@ -0,0 +1,498 @@
+# distributed.py
+#
+# One crawl split across several worker processes or machines. Every URL belongs
+# to one shard, picked by a hash of its host, so each host is fetched (and rate
+# limited) by exactly one worker. Links a worker finds for another shard are
+# forwarded through a coordination backend: an SQLite file for workers on one
+# machine, or Redis for workers on several. The shard sitemaps are merged at the end.
+#
+#   python distributed.py local URL --shards 4 --depth 2
+#   python distributed.py seed URL --backend redis://host:6379/0 --shards 8
+#   python distributed.py worker URL --backend redis://host:6379/0 --shards 8 --shard 3 --depth 2
+#   python distributed.py merge URL --output-dir DIR DIR/sitemap-shard-*.jsonl
+
+import argparse
+import collections
+import glob
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+import http_client
+from crawler import Crawler
+from frontier import canonicalize_url
+from politeness import DEFAULT_CRAWL_DELAY
+from retry_policy import host_of
+from sitemap_io import SitemapWriter, iter_sitemap, export_sitemap_json
+from urls_utils import sanitize_url_for_directory
+
+
+def shard_of(url, num_shards):
+    """
+    The shard that fetches url: a stable hash of its host (with port), the same in every process.
+    """
+    return zlib.crc32(host_of(url).encode('utf-8')) % num_shards
+
+
+class CoordinationBackend:
+    """
+    Per-shard inboxes of (url, depth) pairs plus each shard's idle flag.
+
+    A crawl is finished once every shard is idle and every inbox is empty:
+    only a busy shard can send URLs, and pop() marks a shard busy in the same
+    transaction that takes its URLs, so no URL can be in transit at that point.
+    """
+
+    def reset(self):
+        """
+        Empty every inbox and mark every shard busy, before seeding a new crawl.
+        """
+        raise NotImplementedError
+
+    def push(self, shard, items):
+        raise NotImplementedError
+
+    def pop(self, shard, limit):
+        """
+        Take up to limit (url, depth) pairs from shard's inbox and mark the shard busy.
+        """
+        raise NotImplementedError
+
+    def set_idle(self, shard):
+        raise NotImplementedError
+
+    def finished(self):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteQueue(CoordinationBackend):
+    """
+    Coordination through one SQLite file, for worker processes on one machine.
+    """
+
+    def __init__(self, path, num_shards, timeout=60):
+        self.path = path
+        self.num_shards = num_shards
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS inbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                shard INTEGER,
+                url TEXT,
+                depth INTEGER
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS inbox_by_shard ON inbox (shard, id)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS shards (shard INTEGER PRIMARY KEY, idle INTEGER)")
+        self.lock = threading.Lock()
+
+    def _transaction(self, work):
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = work()
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+            return result
+
+    def reset(self):
+        def work():
+            self.conn.execute("DELETE FROM inbox")
+            self.conn.execute("DELETE FROM shards")
+            self.conn.executemany("INSERT INTO shards VALUES (?, 0)", [(shard,) for shard in range(self.num_shards)])
+        self._transaction(work)
+
+    def push(self, shard, items):
+        self._transaction(lambda: self.conn.executemany(
+            "INSERT INTO inbox (shard, url, depth) VALUES (?, ?, ?)", [(shard, url, depth) for url, depth in items]))
+
+    def pop(self, shard, limit):
+        def work():
+            self.conn.execute("UPDATE shards SET idle = 0 WHERE shard = ?", (shard,))
+            rows = self.conn.execute("SELECT id, url, depth FROM inbox WHERE shard = ? ORDER BY id LIMIT ?",
+                                     (shard, limit)).fetchall()
+            if rows:
+                self.conn.execute("DELETE FROM inbox WHERE shard = ? AND id <= ?", (shard, rows[-1][0]))
+            return [(url, depth) for _, url, depth in rows]
+        return self._transaction(work)
+
+    def set_idle(self, shard):
+        with self.lock:
+            self.conn.execute("UPDATE shards SET idle = 1 WHERE shard = ?", (shard,))
+
+    def finished(self):
+        with self.lock:
+            busy, pending = self.conn.execute(
+                "SELECT (SELECT COUNT(*) FROM shards WHERE idle = 0), (SELECT COUNT(*) FROM inbox)").fetchone()
+        return busy == 0 and pending == 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RedisBackend(CoordinationBackend):
+    """
+    Coordination through a Redis server, for workers on several machines.
+
+    client is a redis-py compatible client (redis.Redis, or LocalRedis in tests).
+    Each inbox is a list of JSON [url, depth] pairs; the idle flags are one hash.
+    Multi-step operations run as MULTI/EXEC transactions.
+    """
+
+    def __init__(self, client, num_shards, namespace='seo_crawl'):
+        self.client = client
+        self.num_shards = num_shards
+        self.namespace = namespace
+        self.idle_key = f"{namespace}:idle"
+
+    def inbox_key(self, shard):
+        return f"{self.namespace}:inbox:{shard}"
+
+    def reset(self):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.idle_key, *[self.inbox_key(shard) for shard in range(self.num_shards)])
+        pipe.hset(self.idle_key, mapping={str(shard): 0 for shard in range(self.num_shards)})
+        pipe.execute()
+
+    def push(self, shard, items):
+        if items:
+            self.client.rpush(self.inbox_key(shard), *[json.dumps([url, depth]) for url, depth in items])
+
+    def pop(self, shard, limit):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hset(self.idle_key, str(shard), 0)
+        pipe.lrange(self.inbox_key(shard), 0, limit - 1)
+        pipe.ltrim(self.inbox_key(shard), limit, -1)
+        _, values, _ = pipe.execute()
+        return [tuple(json.loads(value)) for value in values]
+
+    def set_idle(self, shard):
+        self.client.hset(self.idle_key, str(shard), 1)
+
+    def finished(self):
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hvals(self.idle_key)
+        for shard in range(self.num_shards):
+            pipe.llen(self.inbox_key(shard))
+        flags, *lengths = pipe.execute()
+        return len(flags) == self.num_shards and all(int(flag) == 1 for flag in flags) and not any(lengths)
+
+
+class LocalRedis:
+    """
+    In-process stand-in for the few Redis commands RedisBackend uses, for tests
+    and single-process runs without a Redis server. Values are stored as bytes,
+    as redis-py returns them.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def _encode(value):
+        return value if isinstance(value, bytes) else str(value).encode('utf-8')
+
+    def delete(self, *names):
+        with self.lock:
+            return sum(1 for name in names if self._data.pop(name, None) is not None)
+
+    def rpush(self, name, *values):
+        with self.lock:
+            items = self._data.setdefault(name, [])
+            items.extend(self._encode(value) for value in values)
+            return len(items)
+
+    def lrange(self, name, start, end):
+        with self.lock:
+            items = self._data.get(name, [])
+            return list(items[start:None if end == -1 else end + 1])
+
+    def ltrim(self, name, start, end):
+        with self.lock:
+            items = self._data.get(name, [])
+            self._data[name] = items[start:None if end == -1 else end + 1]
+            return True
+
+    def llen(self, name):
+        with self.lock:
+            return len(self._data.get(name, []))
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        with self.lock:
+            fields = self._data.setdefault(name, {})
+            updates = dict(mapping or {})
+            if key is not None:
+                updates[key] = value
+            added = sum(1 for field in updates if self._encode(field) not in fields)
+            fields.update((self._encode(field), self._encode(value)) for field, value in updates.items())
+            return added
+
+    def hvals(self, name):
+        with self.lock:
+            return list(self._data.get(name, {}).values())
+
+    def pipeline(self, transaction=True):
+        return _LocalPipeline(self)
+
+
+class _LocalPipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self.client.lock:
+            commands, self.commands = self.commands, []
+            return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+def open_backend(spec, num_shards):
+    """
+    A coordination backend from a redis:// (or rediss://, unix://) URL or an SQLite file path.
+    """
+    if spec.startswith(('redis://', 'rediss://', 'unix://')):
+        # Only needed for crawls across machines: pip install redis
+        import redis
+        return RedisBackend(redis.Redis.from_url(spec), num_shards)
+    return SQLiteQueue(spec, num_shards)
+
+
+class ShardCrawler(Crawler):
+    """
+    A Crawler that fetches only its own shard's URLs and forwards the rest to their shards.
+
+    Forwarded URLs are remembered in the seen-set like queued ones, so each is
+    sent once by this shard, or again if it is later found at a shallower
+    depth; the receiving shard drops duplicates from other shards. Outgoing URLs are batched per shard and sent at least every
+    flush_interval seconds while pages complete.
+    """
+
+    def __init__(self, base_url, shard, num_shards, backend, flush_interval=1.0, **options):
+        super().__init__(base_url, **options)
+        self.shard = shard
+        self.num_shards = num_shards
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.outbox = collections.defaultdict(list)  # shard -> [(url, depth), ...]
+        self.forwarded = 0
+        self._last_flush = time.monotonic()
+
+    def enqueue(self, url, depth):
+        shard = shard_of(url, self.num_shards)
+        if shard == self.shard:
+            super().enqueue(url, depth)
+            return
+        # Sent again when found at a shallower depth, for the owning shard to re-expand
+        if self.update_depth(url, depth) is None:
+            return
+        with self.lock:
+            self.outbox[shard].append((url, depth))
+
+    def complete(self, url, depth, links):
+        super().complete(url, depth, links)
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush_outbox()
+
+    def flush_outbox(self):
+        with self.lock:
+            outbox, self.outbox = self.outbox, collections.defaultdict(list)
+        for shard, items in outbox.items():
+            self.backend.push(shard, items)
+            self.forwarded += len(items)
+        self._last_flush = time.monotonic()
+
+
+def shard_sitemap_path(output_dir, shard, num_shards):
+    return os.path.join(output_dir, f"sitemap-shard-{shard:03d}-of-{num_shards:03d}.jsonl")
+
+
+class ShardWorker:
+    """
+    Runs one shard of a distributed crawl until the whole crawl is finished.
+
+    It alternates between taking URLs from its inbox and crawling them, and
+    writes the pages it completes to its own JSON Lines sitemap in output_dir.
+    Unless given a fetch_executor, it fetches on one thread pool of its own for
+    all batches, so the threads' keep-alive sessions are reused between them.
+    """
+
+    def __init__(self, backend, shard, num_shards, base_url, output_dir, max_depth=2, batch_size=500,
+                 poll_interval=0.5, **crawler_options):
+        self.backend = backend
+        self.shard = shard
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.fetch_executor = None
+        if crawler_options.get('fetch_executor') is None:
+            self.fetch_executor = ThreadPoolExecutor(max_workers=crawler_options.get('max_threads', 10))
+            crawler_options['fetch_executor'] = self.fetch_executor
+        self.crawler = ShardCrawler(base_url, shard, num_shards, backend, max_depth=max_depth, **crawler_options)
+        os.makedirs(output_dir, exist_ok=True)
+        self.sitemap_path = self.crawler.enable_sitemap_stream(shard_sitemap_path(output_dir, shard, num_shards))
+
+    def run(self):
+        crawler = self.crawler
+        try:
+            while True:
+                items = self.backend.pop(self.shard, self.batch_size)
+                for url, depth in items:
+                    crawler.enqueue(url, depth)
+                if crawler.scheduler:
+                    crawler.run()
+                # Everything this shard found for others is sent before it can report itself idle
+                crawler.flush_outbox()
+                if items:
+                    continue
+                self.backend.set_idle(self.shard)
+                if self.backend.finished():
+                    break
+                time.sleep(self.poll_interval)
+        finally:
+            crawler.flush_outbox()
+            crawler.sitemap_writer.close()
+            if self.fetch_executor is not None:
+                self.fetch_executor.shutdown(wait=False, cancel_futures=True)
+        print(f"Shard {self.shard}: crawled {len(crawler.sitemap)} pages, forwarded {crawler.forwarded} URLs")
+        return self.sitemap_path
+
+
+def seed(backend, url, num_shards):
+    """
+    Start a distributed crawl at url: reset the backend and queue url on its shard.
+    """
+    url = canonicalize_url(url)
+    backend.reset()
+    backend.push(shard_of(url, num_shards), [(url, 0)])
+
+
+def merge_sitemaps(paths, output_path, base_url=None):
+    """
+    Merge shard sitemaps into one JSON Lines sitemap, streaming record by record.
+    base_url's record is written first, since readers take the first record as the start page.
+    """
+    writer = SitemapWriter(output_path)
+    try:
+        if base_url is not None:
+            for path in paths:
+                record = next(((url, links) for url, links in iter_sitemap(path) if url == base_url), None)
+                if record is not None:
+                    writer.write(*record)
+                    break
+        for path in paths:
+            for url, links in iter_sitemap(path):
+                if url != base_url:
+                    writer.write(url, links)
+    finally:
+        writer.close()
+    return output_path
+
+
+def run_shard(spec, shard, num_shards, base_url, output_dir, max_depth, crawler_options):
+    """
+    Run one ShardWorker against the backend at spec; a module-level target for worker processes.
+    """
+    backend = open_backend(spec, num_shards)
+    try:
+        return ShardWorker(backend, shard, num_shards, base_url, output_dir, max_depth,
+                           **crawler_options).run()
+    finally:
+        backend.close()
+        http_client.close_sessions()
+
+
+def crawl_distributed(base_url, num_shards=4, max_depth=2, output_dir=None, backend_spec=None, **crawler_options):
+    """
+    Crawl base_url with num_shards worker processes on this machine.
+
+    Workers coordinate through an SQLite file in output_dir unless backend_spec
+    names another backend. Returns the path of the merged sitemap.jsonl; a
+    sitemap.json is written next to it.
+    """
+    output_dir = output_dir or os.path.join(os.getcwd(), sanitize_url_for_directory(base_url))
+    os.makedirs(output_dir, exist_ok=True)
+    backend_spec = backend_spec or os.path.join(output_dir, 'coordination.db')
+    backend = open_backend(backend_spec, num_shards)
+    try:
+        seed(backend, base_url, num_shards)
+    finally:
+        backend.close()
+
+    workers = [multiprocessing.Process(target=run_shard, args=(backend_spec, shard, num_shards, base_url, output_dir,
+                                                              max_depth, crawler_options))
+               for shard in range(num_shards)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    failed = [shard for shard, worker in enumerate(workers) if worker.exitcode != 0]
+    if failed:
+        raise RuntimeError(f"Shard workers {failed} failed")
+    return merge_output(base_url, output_dir, num_shards)
+
+
+def merge_output(base_url, output_dir, num_shards=None, paths=None):
+    if paths is None:
+        pattern = '*' if num_shards is None else f"{num_shards:03d}"
+        paths = sorted(glob.glob(os.path.join(output_dir, f"sitemap-shard-*-of-{pattern}.jsonl")))
+    sitemap_path = merge_sitemaps(paths, os.path.join(output_dir, 'sitemap.jsonl'), canonicalize_url(base_url))
+    export_sitemap_json(sitemap_path, os.path.join(output_dir, 'sitemap.json'))
+    print(f"Merged {len(paths)} shard sitemaps into: {sitemap_path}")
+    return sitemap_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl one site with several cooperating workers.")
+    parser.add_argument('command', choices=['local', 'seed', 'worker', 'merge'])
+    parser.add_argument('url')
+    parser.add_argument('paths', nargs='*', help="merge: the shard sitemaps (default: all in --output-dir)")
+    parser.add_argument('--shards', type=int, default=4)
+    parser.add_argument('--shard', type=int, help="worker: which shard to run")
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--backend', help="redis:// URL or SQLite file (default: coordination.db in the output "
+                                          "directory)")
+    parser.add_argument('--output-dir', help="Where shard and merged sitemaps go (default: the usual save "
+                                             "directory for the URL)")
+    parser.add_argument('--threads', type=int, default=10, help="Fetches in flight per worker")
+    parser.add_argument('--crawl-delay', type=float, default=DEFAULT_CRAWL_DELAY)
+    parser.add_argument('--ignore-robots', action='store_true')
+    args = parser.parse_args()
+
+    output_dir = args.output_dir or os.path.join(os.getcwd(), sanitize_url_for_directory(args.url))
+    backend_spec = args.backend or os.path.join(output_dir, 'coordination.db')
+    crawler_options = {'max_threads': args.threads, 'crawl_delay': args.crawl_delay,
+                       'respect_robots': not args.ignore_robots}
+    if args.command == 'local':
+        crawl_distributed(args.url, args.shards, args.depth, output_dir, args.backend, **crawler_options)
+    elif args.command == 'seed':
+        os.makedirs(output_dir, exist_ok=True)
+        backend = open_backend(backend_spec, args.shards)
+        seed(backend, args.url, args.shards)
+        backend.close()
+    elif args.command == 'worker':
+        if args.shard is None:
+            parser.error("worker needs --shard")
+        run_shard(backend_spec, args.shard, args.shards, args.url, output_dir, args.depth, crawler_options)
+    else:
+        merge_output(args.url, output_dir, paths=args.paths or None)
+
+
+if __name__ == '__main__':
+    main()
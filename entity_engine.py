@@ -0,0 +1,113 @@
+# entity_engine.py
+
+import collections
+
+import nltk_resources
+
+# Characters of body text analyzed per page; the rest of a long page is ignored
+DEFAULT_CHAR_BUDGET = 20000
+
+
+class EntityExtractor:
+    """
+    Batch named-entity extraction over many pages.
+
+    Each page's text is cut to char_budget characters and split into sentences.
+    Sentences not seen before are tokenized, POS-tagged and NE-chunked together in
+    batches of batch_size. Results are cached per sentence (up to
+    sentence_cache_size), so boilerplate such as navigation and footers that repeats
+    on every page is analyzed once per process. A sentence that repeats within a
+    page still contributes its entities every time it occurs, just as if each
+    occurrence had been analyzed. Entities are also aggregated across every page
+    passed in.
+    """
+
+    def __init__(self, char_budget=DEFAULT_CHAR_BUDGET, batch_size=256, sentence_cache_size=100000):
+        self.char_budget = char_budget
+        self.batch_size = batch_size
+        self.sentence_cache_size = sentence_cache_size
+        self._sentence_entities = collections.OrderedDict()  # sentence -> ((entity, label), ...)
+        self.entity_pages = collections.Counter()  # (entity, label) -> pages mentioning it
+        self.num_documents = 0
+
+    def _sentences(self, text):
+        if self.char_budget is not None and len(text) > self.char_budget:
+            text = text[:self.char_budget]
+        sentences = []
+        for sentence in nltk_resources.get_sentence_tokenizer().tokenize(text):
+            sentence = " ".join(sentence.split())
+            if sentence:
+                sentences.append(sentence)
+        return sentences
+
+    def _analyze(self, sentences):
+        from nltk.tree import Tree
+
+        word_tokenizer = nltk_resources.get_word_tokenizer()
+        tagger = nltk_resources.get_pos_tagger()
+        chunker = nltk_resources.get_ne_chunker()
+        analyzed = {}
+        for start in range(0, len(sentences), self.batch_size):
+            batch = sentences[start:start + self.batch_size]
+            tagged = tagger.tag_sents([word_tokenizer.tokenize(sentence) for sentence in batch])
+            for sentence, tree in zip(batch, chunker.parse_sents(tagged)):
+                analyzed[sentence] = tuple((" ".join(word for word, tag in node.leaves()), node.label())
+                                           for node in tree if isinstance(node, Tree))
+        return analyzed
+
+    def extract_many(self, texts, aggregate=True):
+        """
+        Return, for each text, its (entity, label) pairs in sentence order.
+        With aggregate, the pages also count towards top_entities().
+        """
+        page_sentences = [self._sentences(text) for text in texts]
+        cache = self._sentence_entities
+        lookup = {}
+        pending = []
+        for sentences in page_sentences:
+            for sentence in sentences:
+                if sentence in lookup:
+                    continue
+                found = cache.get(sentence)
+                if found is None:
+                    pending.append(sentence)
+                else:
+                    cache.move_to_end(sentence)
+                lookup[sentence] = found
+        analyzed = self._analyze(pending)
+        lookup.update(analyzed)
+        cache.update(analyzed)
+        while len(cache) > self.sentence_cache_size:
+            cache.popitem(last=False)
+
+        results = []
+        for sentences in page_sentences:
+            entities = [entity for sentence in sentences for entity in lookup[sentence]]
+            if aggregate:
+                self.num_documents += 1
+                self.entity_pages.update(set(entities))
+            results.append(entities)
+        return results
+
+    def extract(self, text, aggregate=True):
+        return self.extract_many([text], aggregate)[0]
+
+    def top_entities(self, k=20):
+        """
+        The k entities found on the most pages, as [(entity, label, pages), ...].
+        """
+        return [(entity, label, pages) for (entity, label), pages in self.entity_pages.most_common(k)]
+
+
+_extractor = None
+
+
+def get_extractor():
+    """
+    Return this process's shared EntityExtractor, so its sentence cache is reused across calls.
+    Callers pass aggregate=False to it; crawl-wide counts use an extractor of their own.
+    """
+    global _extractor
+    if _extractor is None:
+        _extractor = EntityExtractor()
+    return _extractor
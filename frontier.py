@@ -0,0 +1,153 @@
+# frontier.py
+
+import hashlib
+import heapq
+import itertools
+import math
+import threading
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so that trivially different spellings of the same page compare equal.
+
+    Lowercases the scheme and host, drops default ports and the fragment, sorts the
+    query parameters and strips trailing slashes from non-root paths.
+    Raises ValueError for URLs with an invalid port.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if ':' in host:
+        host = f'[{host}]'
+    netloc = host
+    if parts.username is not None:
+        userinfo = parts.username if parts.password is None else f'{parts.username}:{parts.password}'
+        netloc = f'{userinfo}@{netloc}'
+    port = parts.port
+    if port is not None and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f'{netloc}:{port}'
+    path = parts.path or '/'
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+class SeenSet:
+    """
+    Thread-safe exact set of URLs already scheduled, with O(1) membership checks.
+    """
+
+    def __init__(self):
+        self._urls = set()
+        self.lock = threading.Lock()
+
+    def add(self, url):
+        """
+        Add url and return True if it had not been seen before.
+        """
+        with self.lock:
+            if url in self._urls:
+                return False
+            self._urls.add(url)
+            return True
+
+    def __contains__(self, url):
+        with self.lock:
+            return url in self._urls
+
+    def __iter__(self):
+        with self.lock:
+            return iter(list(self._urls))
+
+    def __len__(self):
+        with self.lock:
+            return len(self._urls)
+
+
+class BloomFilter:
+    """
+    Probabilistic seen-set with memory fixed by capacity and error_rate.
+
+    Membership checks may report an unseen URL as seen with probability close to
+    error_rate once capacity URLs have been added; they never miss a URL that was
+    added. Suited to multi-million-URL crawls where an exact set does not fit.
+    Only the seen-set is bounded: Crawler.sitemap still holds every crawled URL.
+    """
+
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.num_hashes = max(1, int(round(self.num_bits / capacity * math.log(2))))
+        self._bits = bytearray((self.num_bits + 7) // 8)
+        self._count = 0
+        self.lock = threading.Lock()
+
+    def _positions(self, url):
+        digest = hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.num_bits for i in range(self.num_hashes)]
+
+    def add(self, url):
+        """
+        Add url and return True if it was (probably) not seen before.
+        """
+        positions = self._positions(url)
+        with self.lock:
+            new = False
+            for position in positions:
+                byte, bit = divmod(position, 8)
+                if not self._bits[byte] & (1 << bit):
+                    self._bits[byte] |= 1 << bit
+                    new = True
+            if new:
+                self._count += 1
+            return new
+
+    def __contains__(self, url):
+        positions = self._positions(url)
+        with self.lock:
+            return all(self._bits[position // 8] & (1 << (position % 8)) for position in positions)
+
+    def __len__(self):
+        return self._count
+
+
+class Frontier:
+    """
+    Priority-ordered queue of URLs waiting to be fetched, with the crawl depth of each URL.
+
+    Entries are ordered by priority (the depth by default), then by insertion
+    order, so the crawl proceeds level by level.
+    """
+
+    def __init__(self):
+        self._heap = []
+        self._counter = itertools.count()
+        self.lock = threading.Lock()
+
+    def push(self, url, depth, priority=None):
+        if priority is None:
+            priority = depth
+        with self.lock:
+            heapq.heappush(self._heap, (priority, next(self._counter), url, depth))
+
+    def pop(self):
+        """
+        Return the next (url, depth) pair, or None if the frontier is empty.
+        """
+        with self.lock:
+            if not self._heap:
+                return None
+            _, _, url, depth = heapq.heappop(self._heap)
+            return url, depth
+
+    def __len__(self):
+        with self.lock:
+            return len(self._heap)
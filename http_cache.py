@@ -0,0 +1,122 @@
+# http_cache.py
+
+import json
+import sqlite3
+import threading
+import zlib
+from page_store import Page
+
+
+class CacheEntry:
+    """
+    A cached page: its validators, content hash, body and the links parsed from it.
+    """
+
+    def __init__(self, url, etag, last_modified, content_hash, status_code, headers, text, links):
+        self.url = url
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.status_code = status_code
+        self.headers = headers
+        self.text = text
+        self.links = links
+
+    def conditional_headers(self):
+        conditional = {}
+        if self.etag:
+            conditional['If-None-Match'] = self.etag
+        if self.last_modified:
+            conditional['If-Modified-Since'] = self.last_modified
+        return conditional
+
+    def to_page(self, elapsed=0.0):
+        page = Page(self.url, status_code=self.status_code, headers=self.headers, text=self.text, elapsed=elapsed)
+        page.from_cache = True
+        return page
+
+
+class HttpCache:
+    """
+    Persistent SQLite cache of crawled pages keyed by canonical URL, used for conditional recrawls.
+
+    Besides the page bodies it keeps per-page analysis results keyed by content hash,
+    so an unchanged page does not have to be analyzed again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pages (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                status_code INTEGER,
+                headers TEXT,
+                body BLOB,
+                links TEXT
+            )""")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS analysis (
+                url TEXT,
+                kind TEXT,
+                content_hash TEXT,
+                result TEXT,
+                PRIMARY KEY (url, kind)
+            )""")
+
+    def get(self, url):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, content_hash, status_code, headers, body, links FROM pages WHERE url = ?",
+                (url,)).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content_hash, status_code, headers, body, links = row
+        return CacheEntry(url, etag, last_modified, content_hash, status_code, json.loads(headers),
+                          zlib.decompress(body).decode('utf-8'), json.loads(links))
+
+    def put(self, page, links):
+        row = (page.url, page.headers.get('ETag'), page.headers.get('Last-Modified'), page.content_hash,
+               page.status_code, json.dumps(dict(page.headers)), zlib.compress(page.text.encode('utf-8')),
+               json.dumps(links))
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row)
+
+    def get_analysis(self, url, kind, content_hash):
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT result FROM analysis WHERE url = ? AND kind = ? AND content_hash = ?",
+                (url, kind, content_hash)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put_analysis(self, url, kind, content_hash, result):
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO analysis VALUES (?, ?, ?, ?)",
+                              (url, kind, content_hash, json.dumps(result)))
+
+    def record_hit(self):
+        with self.lock:
+            self.hits += 1
+
+    def record_miss(self):
+        with self.lock:
+            self.misses += 1
+
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def report(self):
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate()}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,82 @@
+# http_client.py
+
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urls_utils import headers
+
+# urllib3 only decodes brotli responses when a brotli package is installed
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = 'gzip, deflate, br'
+    except ImportError:
+        ACCEPT_ENCODING = 'gzip, deflate'
+
+# Number of hosts whose connection pools each session keeps, and connections kept per host
+POOL_CONNECTIONS = 20
+POOL_MAXSIZE = 10
+
+_local = threading.local()
+_sessions = []
+_sessions_lock = threading.Lock()
+
+
+def configure(pool_connections=None, pool_maxsize=None):
+    """
+    Set the pool sizes used by sessions created from now on.
+    """
+    global POOL_CONNECTIONS, POOL_MAXSIZE
+    if pool_connections is not None:
+        POOL_CONNECTIONS = pool_connections
+    if pool_maxsize is not None:
+        POOL_MAXSIZE = pool_maxsize
+
+
+def create_session():
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers.update(headers)
+    session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+    return session
+
+
+def get_session():
+    """
+    Return this thread's session, creating it on first use.
+
+    requests.Session is not guaranteed to be thread-safe, so each thread gets its
+    own; connections are kept alive and reused across all requests on that thread.
+    """
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = create_session()
+        _local.session = session
+        with _sessions_lock:
+            _sessions.append(session)
+    return session
+
+
+def close_sessions():
+    """
+    Close every session created so far and release their connections.
+    """
+    with _sessions_lock:
+        sessions = list(_sessions)
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+    _local.__dict__.pop('session', None)
+
+
+def get(url, **kwargs):
+    return get_session().get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return get_session().head(url, **kwargs)
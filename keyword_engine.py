@@ -0,0 +1,102 @@
+# keyword_engine.py
+
+import collections
+import hashlib
+import heapq
+import math
+import re
+import zlib
+from array import array
+from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+
+# Same tokenization as sklearn's TfidfVectorizer defaults
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def tokenize(text, stop_words=ENGLISH_STOP_WORDS):
+    return [token for token in TOKEN_PATTERN.findall(text.lower()) if token not in stop_words]
+
+
+class BoundedCounter:
+    """
+    Term counter that holds at most about 2 * capacity terms.
+
+    When it grows past that, it keeps only the capacity most frequent terms. Counts
+    are exact as long as the vocabulary fits; beyond that, rare terms are dropped,
+    which never affects the top of the ranking on realistic text.
+    """
+
+    def __init__(self, capacity=100000):
+        self.capacity = capacity
+        self.counts = {}
+
+    def update(self, term_counts):
+        counts = self.counts
+        for term, count in term_counts.items():
+            counts[term] = counts.get(term, 0) + count
+        if len(counts) > 2 * self.capacity:
+            self.counts = dict(heapq.nlargest(self.capacity, counts.items(), key=lambda item: item[1]))
+
+    def most_common(self, k):
+        # Highest count first, ties broken alphabetically
+        return heapq.nsmallest(k, self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+
+class StreamingKeywordExtractor:
+    """
+    Keyword extraction fed one page at a time, in bounded memory.
+
+    Term frequencies go into a BoundedCounter. Document frequencies are counted
+    in a fixed array of n_features hashed buckets. Each page keeps only its
+    page_candidates most frequent terms. Per-page TF-IDF (sklearn's smoothed
+    idf) is scored when asked for, using the final document frequencies.
+    """
+
+    def __init__(self, n_features=2 ** 20, vocabulary_capacity=100000, page_candidates=50):
+        self.n_features = n_features
+        self.document_frequency = array('I', bytes(4 * n_features))
+        self.term_counts = BoundedCounter(vocabulary_capacity)
+        self.page_candidates = page_candidates
+        self.pages = []  # (url, [(term, tf), ...])
+        self.num_documents = 0
+        self._distinct_documents = set()
+
+    def _bucket(self, term):
+        return zlib.crc32(term.encode('utf-8')) % self.n_features
+
+    def add_document(self, url, text):
+        term_frequency = collections.Counter(tokenize(text))
+        self.num_documents += 1
+        if len(self._distinct_documents) < 2:
+            self._distinct_documents.add(hashlib.sha1(text.encode('utf-8')).digest())
+        self.term_counts.update(term_frequency)
+        for term in term_frequency:
+            self.document_frequency[self._bucket(term)] += 1
+        self.pages.append((url, heapq.nlargest(self.page_candidates, term_frequency.items(),
+                                               key=lambda item: item[1])))
+
+    def idf(self, term):
+        return math.log((1 + self.num_documents) / (1 + self.document_frequency[self._bucket(term)])) + 1
+
+    def top_terms(self, k=10):
+        """
+        Site-wide keywords: the k most frequent terms across all pages, in alphabetical order.
+
+        This matches what TfidfVectorizer(stop_words='english', max_features=k)
+        returned from get_feature_names_out(), including returning nothing
+        unless at least two distinct pages were seen.
+        """
+        if len(self._distinct_documents) < 2:
+            return []
+        return sorted(term for term, count in self.term_counts.most_common(k))
+
+    def page_keywords(self, k=10):
+        """
+        Yield (url, [(term, tfidf), ...]) with each page's top k terms by TF-IDF.
+        Scores are L2-normalized over the page's candidate terms rather than its whole vocabulary.
+        """
+        for url, candidates in self.pages:
+            scored = [(term, tf * self.idf(term)) for term, tf in candidates]
+            norm = math.sqrt(sum(score * score for term, score in scored)) or 1.0
+            top = heapq.nlargest(k, scored, key=lambda item: item[1])
+            yield url, [(term, score / norm) for term, score in top]
@@ -0,0 +1,133 @@
+# keyword_matcher.py
+
+import collections
+import re
+
+# Words as the matcher sees them; a keyword only matches whole words, so "art" never matches "start"
+WORD_PATTERN = re.compile(r"\w+")
+
+
+class KeywordMatcher:
+    """
+    Finds many keywords in a text in one pass over its words.
+
+    Keywords (single words or phrases) are split into words once, when the
+    matcher is built, and indexed by their first word. Scanning a text walks
+    its words once and only compares phrases that start with the current word,
+    so the cost grows with the text, not with the number of keywords. Matching
+    is case-insensitive unless case_sensitive is set; a phrase matches its words
+    separated by any non-word characters ("on-page" matches "on page").
+    """
+
+    def __init__(self, keywords, case_sensitive=False):
+        self.case_sensitive = case_sensitive
+        self.keywords = []
+        self._index = {}  # first word -> [(words, keyword), ...], longest phrase first
+        for keyword in dict.fromkeys(keywords):
+            words = tuple(self._normalize(word) for word in WORD_PATTERN.findall(keyword))
+            if not words:
+                continue
+            self.keywords.append(keyword)
+            self._index.setdefault(words[0], []).append((words, keyword))
+        for phrases in self._index.values():
+            phrases.sort(key=lambda phrase: -len(phrase[0]))
+        self._phrase_heads = {word for word, phrases in self._index.items()
+                              if any(len(phrase) > 1 for phrase, keyword in phrases)}
+        # Finds just the words that start a keyword, so positions() skips every other word in C
+        heads = sorted(self._index, key=len, reverse=True)
+        self._head_pattern = re.compile(r"(?<!\w)(?:" + "|".join(map(re.escape, heads)) + r")(?!\w)") if heads else None
+
+    def _normalize(self, word):
+        return word if self.case_sensitive else word.lower()
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def scan(self, text):
+        """
+        Yield (keyword, start, end) for every match in text, in text order.
+        Overlapping matches of different keywords are all reported.
+        """
+        if not self._index:
+            return
+        index = self._index
+        normalize = self._normalize
+        pending = []  # (phrase words, keyword, next word to match, start) for phrases matched so far
+        for match in WORD_PATTERN.finditer(text):
+            word = normalize(match.group())
+            if pending:
+                still_pending = []
+                for phrase, keyword, next_word, start in pending:
+                    if phrase[next_word] != word:
+                        continue
+                    if next_word + 1 == len(phrase):
+                        yield keyword, start, match.end()
+                    else:
+                        still_pending.append((phrase, keyword, next_word + 1, start))
+                pending = still_pending
+
+            phrases = index.get(word)
+            if phrases is not None:
+                for phrase, keyword in phrases:
+                    if len(phrase) == 1:
+                        yield keyword, match.start(), match.end()
+                    else:
+                        pending.append((phrase, keyword, 1, match.start()))
+
+    def positions(self, text):
+        """
+        {keyword: [(start, end), ...]} character spans of each keyword found in text.
+        """
+        found = {}
+        folded = text if self.case_sensitive else text.lower()
+        if self._head_pattern is None or len(folded) != len(text):
+            # Lowercasing moved characters, so offsets in folded would not be offsets in text
+            for keyword, start, end in self.scan(text):
+                found.setdefault(keyword, []).append((start, end))
+            return found
+
+        # Same matches as scan(): the words that start a keyword are found by one regex
+        # search, and phrases are completed by reading the words that follow
+        for match in self._head_pattern.finditer(folded):
+            for phrase, keyword in self._index[match.group()]:
+                end = match.end()
+                if len(phrase) > 1:
+                    following = WORD_PATTERN.finditer(folded, end)
+                    for word in phrase[1:]:
+                        next_match = next(following, None)
+                        if next_match is None or next_match.group() != word:
+                            break
+                        end = next_match.end()
+                    else:
+                        found.setdefault(keyword, []).append((match.start(), end))
+                    continue
+                found.setdefault(keyword, []).append((match.start(), end))
+        return found
+
+    def counts(self, text):
+        """
+        {keyword: matches} for each keyword found in text, in the order the keywords were given.
+        """
+        # Same matches as scan(), but without match objects: words are counted in C and
+        # only the words that start a phrase are looked at individually. Words are
+        # lowercased one by one, as in scan(): lowercasing the whole text first can
+        # change where words break (e.g. "İ" lowercases to "i" plus a combining dot)
+        words = WORD_PATTERN.findall(text)
+        if not self.case_sensitive:
+            words = [word.lower() for word in words]
+        word_counts = collections.Counter(words)
+        found = {}
+        for word in self._index.keys() & word_counts.keys():
+            for phrase, keyword in self._index[word]:
+                if len(phrase) == 1:
+                    found[keyword] = word_counts[word]
+        if self._phrase_heads:
+            heads = self._phrase_heads
+            for i in [i for i, word in enumerate(words) if word in heads]:
+                for phrase, keyword in self._index[words[i]]:
+                    if len(phrase) > 1 and tuple(words[i:i + len(phrase)]) == phrase:
+                        found[keyword] = found.get(keyword, 0) + 1
+        return {keyword: found[keyword] for keyword in self.keywords if keyword in found}
@@ -0,0 +1,240 @@
+# link_graph.py
+
+import re
+from array import array
+from urllib.parse import urlsplit
+import numpy as np
+from scipy import sparse
+from scipy.sparse import csgraph
+from sitemap_io import iter_sitemap
+
+
+# Host and path of an absolute URL in one regex match; urlsplit is several times slower
+_URL_PARTS = re.compile(r"[A-Za-z][A-Za-z0-9+.-]*://([^/?#]*)([^?#]*)")
+
+
+def host_and_path(url):
+    """
+    (host, path) of url, with the host lowercased and without a leading 'www.',
+    so both spellings count as one site.
+    """
+    match = _URL_PARTS.match(url)
+    if match is not None:
+        host, path = match.groups()
+    else:
+        parts = urlsplit(url)
+        host, path = parts.netloc, parts.path
+    host = host.lower()
+    return (host[4:] if host.startswith('www.') else host), path
+
+
+def host_key(url):
+    return host_and_path(url)[0]
+
+
+class LinkGraph:
+    """
+    Link graph of a crawl with URLs interned to integer ids and edges in CSR form.
+
+    Pages are added one at a time, so a sitemap is never held in memory as
+    strings twice. Edges are buffered in compact integer arrays and turned into
+    a scipy.sparse matrix once, on first use. Every metric is computed with
+    vectorized NumPy/SciPy passes over that matrix. Repeated links from a page
+    to the same target are kept as edge weights.
+    """
+
+    def __init__(self, base_url=None):
+        self.ids = {}
+        self.urls = []
+        self.host_ids = {}
+        self.hosts = []
+        self._url_host = array('i')  # url id -> host id
+        self._crawled = bytearray()  # 1 for urls that have a sitemap record
+        self._src = array('i')
+        self._dst = array('i')
+        self.base_url = base_url
+        self._matrix = None
+
+    def intern(self, url):
+        url_id = self.ids.get(url)
+        if url_id is None:
+            url_id = len(self.urls)
+            self.ids[url] = url_id
+            self.urls.append(url)
+            host = host_key(url)
+            host_id = self.host_ids.get(host)
+            if host_id is None:
+                host_id = len(self.hosts)
+                self.host_ids[host] = host_id
+                self.hosts.append(host)
+            self._url_host.append(host_id)
+            self._crawled.append(0)
+        return url_id
+
+    def add_page(self, url, links):
+        if self.base_url is None:
+            self.base_url = url
+        src = self.intern(url)
+        self._crawled[src] = 1
+        intern = self.intern
+        self._src.extend([src] * len(links))
+        self._dst.extend(intern(link) for link in links)
+        self._matrix = None
+
+    @classmethod
+    def from_sitemap(cls, path):
+        """
+        Build the graph from a sitemap file in one streaming pass; the first record is the start page.
+        """
+        graph = cls()
+        for url, links in iter_sitemap(path):
+            graph.add_page(url, links)
+        return graph
+
+    def __len__(self):
+        return len(self.urls)
+
+    @property
+    def num_links(self):
+        return len(self._src)
+
+    @property
+    def matrix(self):
+        """
+        n x n CSR matrix; entry (i, j) is the number of links from page i to page j.
+        """
+        if self._matrix is None:
+            n = len(self.urls)
+            src = np.frombuffer(self._src, dtype=np.int32)
+            dst = np.frombuffer(self._dst, dtype=np.int32)
+            self._matrix = sparse.csr_matrix((np.ones(len(src), dtype=np.float64), (src, dst)), shape=(n, n))
+            self._matrix.sum_duplicates()
+        return self._matrix
+
+    @property
+    def root(self):
+        return self.ids.get(self.base_url)
+
+    @property
+    def crawled(self):
+        return np.frombuffer(bytes(self._crawled), dtype=np.uint8).astype(bool)
+
+    def out_degree(self):
+        """
+        Distinct pages each page links to.
+        """
+        return np.diff(self.matrix.indptr)
+
+    def in_degree(self):
+        """
+        Distinct pages linking to each page.
+        """
+        return np.bincount(self.matrix.indices, minlength=len(self.urls))
+
+    def inbound_links(self):
+        """
+        Number of links pointing at each page, counting repeats.
+        """
+        return np.bincount(np.frombuffer(self._dst, dtype=np.int32), minlength=len(self.urls))
+
+    def _internal_edges(self):
+        url_host = np.frombuffer(self._url_host, dtype=np.int32)
+        base_host = self.host_ids.get(host_key(self.base_url)) if self.base_url is not None else None
+        return url_host[np.frombuffer(self._dst, dtype=np.int32)] == base_host
+
+    def link_split(self):
+        """
+        (internal, external) link counts, by whether the target is on the start page's host.
+        """
+        internal = int(np.count_nonzero(self._internal_edges()))
+        return internal, self.num_links - internal
+
+    def external_domains(self):
+        """
+        {host: links} for every external host linked to, most linked first.
+        """
+        url_host = np.frombuffer(self._url_host, dtype=np.int32)
+        targets = np.frombuffer(self._dst, dtype=np.int32)[~self._internal_edges()]
+        counts = np.bincount(url_host[targets], minlength=len(self.hosts))
+        order = np.argsort(-counts, kind='stable')
+        return {self.hosts[i]: int(counts[i]) for i in order if counts[i] > 0}
+
+    def pagerank(self, damping=0.85, tol=1e-6, max_iter=100):
+        """
+        PageRank by power iteration over the row-normalized link matrix.
+        Rank held by pages without outgoing links is spread evenly over all pages.
+        """
+        n = len(self.urls)
+        if n == 0:
+            return np.zeros(0)
+        matrix = self.matrix
+        out_weight = np.asarray(matrix.sum(axis=1)).ravel()
+        dangling = out_weight == 0
+        inverse = np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)
+        transition = sparse.diags(inverse) @ matrix
+        transition_t = transition.T.tocsr()
+        rank = np.full(n, 1.0 / n)
+        for _ in range(max_iter):
+            new_rank = damping * (transition_t @ rank + rank[dangling].sum() / n) + (1 - damping) / n
+            converged = np.abs(new_rank - rank).sum() < n * tol
+            rank = new_rank
+            if converged:
+                break
+        return rank
+
+    def click_depth(self):
+        """
+        Fewest clicks from the start page to each page; -1 for pages it cannot reach.
+        """
+        n = len(self.urls)
+        depth = np.full(n, -1, dtype=np.int64)
+        if self.root is None:
+            return depth
+        distances = csgraph.shortest_path(self.matrix, directed=True, unweighted=True, indices=self.root)
+        reachable = np.isfinite(distances)
+        depth[reachable] = distances[reachable]
+        return depth
+
+    def orphans(self):
+        """
+        Crawled pages other than the start page that no other page links to.
+        """
+        matrix = self.matrix.tocoo()
+        not_self = matrix.row != matrix.col
+        linked = np.bincount(matrix.col[not_self], minlength=len(self.urls)) > 0
+        orphan = self.crawled & ~linked
+        if self.root is not None:
+            orphan[self.root] = False
+        return [self.urls[i] for i in np.flatnonzero(orphan)]
+
+    def top(self, values, k=10):
+        """
+        [(url, value), ...] for the k largest values, largest first.
+        """
+        k = min(k, len(values))
+        if k == 0:
+            return []
+        candidates = np.argpartition(-values, k - 1)[:k]
+        order = candidates[np.argsort(-values[candidates], kind='stable')]
+        return [(self.urls[i], values[i].item()) for i in order]
+
+    def summary(self, k=10):
+        """
+        The headline link metrics as plain JSON-serializable data.
+        """
+        internal, external = self.link_split()
+        depth = self.click_depth()
+        reached = depth[depth >= 0]
+        return {
+            "pages": int(self.crawled.sum()),
+            "urls": len(self.urls),
+            "links": self.num_links,
+            "internal_links": internal,
+            "external_links": external,
+            "top_external_domains": list(self.external_domains().items())[:k],
+            "most_linked_pages": self.top(self.inbound_links(), k),
+            "top_pagerank": self.top(self.pagerank(), k),
+            "orphan_pages": self.orphans(),
+            "click_depth": {int(d): int(c) for d, c in enumerate(np.bincount(reached))} if len(reached) else {},
+            "unreachable_pages": int(np.count_nonzero(self.crawled & (depth < 0))),
+        }
@@ -1,10 +1,18 @@
 # main.py
+import argparse
 import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from crawler import Crawler
+from politeness import DEFAULT_CRAWL_DELAY, RobotsCache
+from analysis_executor import AnalysisExecutor
+from page_snapshot import BACKENDS, available_backends, set_default_backend
+from result_store import open_result_store, export_json
 from analysis_functions import extract_keywords, url_optimization_analysis, content_organization_strategy, \
-    content_analysis_input
+    content_analysis_input, named_entity_analysis
 import requests
+import http_client
 import random
 from urllib.parse import urlparse
 
@@ -34,7 +42,257 @@ def validate_url(url):
     return True
 
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Crawl a website and run the SEO analyses on it.")
+    parser.add_argument('--sites', metavar='FILE',
+                        help="Batch mode: crawl and analyze every site listed in FILE (one URL per line) "
+                             "without prompting")
+    parser.add_argument('--depth', type=int, default=None,
+                        help="Maximum depth to crawl (prompted for if not given; default in batch mode: 2)")
+    parser.add_argument('--output-dir', default='.',
+                        help="Batch mode: directory for the per-site outputs and run_summary.json "
+                             "(default: the working directory)")
+    parser.add_argument('--parallel-sites', type=int, default=8,
+                        help="Batch mode: sites crawled at once (default: 8)")
+    parser.add_argument('--concurrency', type=int, default=64,
+                        help="Batch mode: fetches in flight across all sites (default: 64)")
+    parser.add_argument('--threads', type=int, default=10,
+                        help="Fetches in flight for any one site (default: 10)")
+    parser.add_argument('--resume', action='store_true',
+                        help="Resume an interrupted crawl of the same URL from its checkpoint")
+    parser.add_argument('--checkpoint-interval', type=float, default=30,
+                        help="Seconds between crawl checkpoints (default: 30)")
+    parser.add_argument('--cache', metavar='PATH', default=None,
+                        help="SQLite cache of crawled pages, so recrawls only download pages that changed "
+                             "(default: http_cache.db in each site's output directory)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="Fetch every page in full and keep no page cache")
+    parser.add_argument('--ignore-robots', action='store_true',
+                        help="Fetch pages even where robots.txt disallows them")
+    parser.add_argument('--crawl-delay', type=float, default=DEFAULT_CRAWL_DELAY,
+                        help="Seconds between requests to one host unless its robots.txt asks for more "
+                             f"(default: {DEFAULT_CRAWL_DELAY})")
+    parser.add_argument('--max-per-host', type=int, default=2,
+                        help="Requests in flight against any one host (default: 2)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Worker processes for the analysis stages (default: one per CPU)")
+    parser.add_argument('--entities', action='store_true',
+                        help="Also extract named entities across the crawl (needs the NLTK data, "
+                             "see nltk_resources.py)")
+    parser.add_argument('--entity-char-budget', type=int, default=20000,
+                        help="Characters of each page's text analyzed for named entities (default: 20000)")
+    parser.add_argument('--parser', choices=list(BACKENDS), default=None,
+                        help="HTML parser used to extract pages (default: the fastest one installed, "
+                             f"currently {available_backends()[0]})")
+    parser.add_argument('--result-store', choices=['sqlite', 'parquet', 'json'], default='sqlite',
+                        help="Where analysis results go: results.db, a results/ Parquet directory, or the "
+                             "per-URL JSON files (default: sqlite)")
+    parser.add_argument('--export-json', action='store_true',
+                        help="Also export the stored results in the per-URL JSON layout")
+    args = parser.parse_args(argv)
+    if args.sites and args.depth is None:
+        args.depth = 2
+    if args.parser is not None and args.parser not in available_backends():
+        parser.error(f"--parser {args.parser} is not installed; available: {', '.join(available_backends())}")
+    return args
+
+
+def resolve_scheme(url_to_crawl):
+    """
+    Add https:// or http:// to a URL without a scheme, whichever the server answers on.
+    """
+    if url_to_crawl.startswith(('http://', 'https://')):
+        return url_to_crawl
+    user_agent = get_random_user_agent()
+    headers = {"User-Agent": user_agent}
+    try:
+        response = http_client.head('https://' + url_to_crawl, headers=headers)
+        if response.status_code < 400:  # if the server responds okay
+            return 'https://' + url_to_crawl
+        return 'http://' + url_to_crawl
+    except requests.ConnectionError:
+        return 'http://' + url_to_crawl
+
+
+def run_analyses(sitemap_data, page_store, main_save_directory, args, executor):
+    """
+    Run every analysis stage over a crawled site. Returns where the results were stored.
+    """
+    # Results from every stage go to one store instead of a JSON file per URL per analysis
+    if args.result_store == 'json':
+        result_store = None
+    else:
+        store_name = 'results.db' if args.result_store == 'sqlite' else 'results'
+        result_store = open_result_store(os.path.join(main_save_directory, store_name), args.result_store)
+
+    try:
+        # Extracting keywords
+        keywords = extract_keywords(sitemap_data, page_store, executor, main_save_directory, result_store)
+
+        # Running URL Optimization Analysis
+        url_optimization_analysis(sitemap_data, keywords, main_save_directory, page_store, executor, result_store)
+
+        # Running Content Organization Strategy Analysis
+        content_organization_strategy(sitemap_data, main_save_directory, page_store, executor, result_store)
+
+        # Running Content Analysis Input
+        content_analysis_input(sitemap_data, main_save_directory, page_store, executor, result_store)
+
+        # Running Named Entity Analysis
+        if args.entities:
+            named_entity_analysis(sitemap_data, main_save_directory, page_store, executor,
+                                  char_budget=args.entity_char_budget, result_store=result_store)
+
+        if result_store is not None and args.export_json:
+            export_json(result_store, main_save_directory)
+    finally:
+        if result_store is not None:
+            result_store.close()
+    return result_store.path if result_store is not None else main_save_directory
+
+
+def crawl_site(url_to_crawl, max_depth, args, executor, **crawler_options):
+    """
+    Crawl one site, save its sitemap and analyze it. Returns (sitemap path, results path, crawler).
+    """
+    # Crawl the website and get sitemap
+    crawler = Crawler(url_to_crawl, max_depth, max_threads=args.threads, respect_robots=not args.ignore_robots,
+                      crawl_delay=args.crawl_delay, max_per_host=args.max_per_host, **crawler_options)
+    try:
+        if not args.no_cache:
+            crawler.enable_cache(args.cache)
+        crawler.enable_checkpoint(interval=args.checkpoint_interval, resume=args.resume)
+        crawler.enable_sitemap_stream()
+        sitemap_data = crawler.crawl()
+
+        # Save the sitemap
+        sitemap_filepath = crawler.save_sitemap()
+        main_save_directory = os.path.dirname(sitemap_filepath)
+
+        # Every stage reads pages from the crawler's page store instead of refetching them
+        results_path = run_analyses(sitemap_data, crawler.page_store, main_save_directory, args, executor)
+    finally:
+        # A failed site in a batch run must not leave its files open
+        if crawler.sitemap_writer is not None:
+            crawler.sitemap_writer.close()
+        if crawler.checkpoint is not None:
+            crawler.checkpoint.close()
+        if crawler.http_cache is not None:
+            crawler.http_cache.close()
+    return sitemap_filepath, results_path, crawler
+
+
+def site_error(crawler):
+    """
+    Why a crawled site counts as failed in a batch run, or None if its start page was fetched.
+    """
+    base_url = crawler.base_url
+    if crawler.robots is not None and crawler.robots.unreachable(base_url):
+        return f"robots.txt of {base_url} could not be fetched"
+    page = crawler.page_store.get(base_url)
+    if page is None:
+        return f"{base_url} was not fetched"
+    if not page.ok:
+        return f"{base_url} could not be fetched: {page.error or f'HTTP {page.status_code}'}"
+    return None
+
+
+def read_sites(path):
+    """
+    Site URLs from a file, one per line; blank lines and lines starting with # are ignored.
+    URLs without a scheme get https://.
+    """
+    with open(path) as file:
+        for line in file:
+            site = line.strip()
+            if not site or site.startswith('#'):
+                continue
+            yield site if site.startswith(('http://', 'https://')) else 'https://' + site
+
+
+def run_batch(args):
+    """
+    Crawl and analyze every site in args.sites in this one process.
+
+    Up to args.parallel_sites sites are crawled at once. Their fetches share one
+    pool of args.concurrency threads, so the total in flight stays within that
+    budget however many sites run, and connections, robots.txt files, the
+    analysis worker processes and loaded models are reused from site to site.
+    Each site gets its usual output directory under args.output_dir, and
+    run_summary.json there records how every site went; a site whose start
+    page could not be fetched counts as failed.
+    """
+    output_root = os.path.abspath(args.output_dir)
+    os.makedirs(output_root, exist_ok=True)
+    sites = list(dict.fromkeys(read_sites(args.sites)))
+    summary_path = os.path.join(output_root, 'run_summary.json')
+    robots = RobotsCache()
+    # Sessions are per fetch thread, so --concurrency sets how many there are; each
+    # thread may fetch from any site being crawled, so keep a pool for each of them
+    http_client.configure(pool_connections=max(http_client.POOL_CONNECTIONS, args.parallel_sites))
+    outcomes = []
+    futures = []
+    started = time.monotonic()
+
+    def run_site(url):
+        site_started = time.monotonic()
+        outcome = {"url": url}
+        try:
+            sitemap_filepath, results_path, crawler = crawl_site(
+                url, args.depth, args, executor, output_root=output_root, fetch_executor=fetch_executor,
+                robots=robots)
+            error = site_error(crawler)
+            outcome.update(status="error" if error else "ok", pages=len(crawler.sitemap),
+                           skipped_by_robots=crawler.skipped, unreachable=crawler.unreachable,
+                           sitemap=sitemap_filepath, results=results_path)
+            if error:
+                outcome["error"] = error
+        except Exception as exc:
+            outcome.update(status="error", error=f"{type(exc).__name__}: {exc}")
+        outcome["seconds"] = round(time.monotonic() - site_started, 3)
+        return outcome
+
+    print(f"Crawling {len(sites)} sites, {args.parallel_sites} at a time, "
+          f"with {args.concurrency} fetches in flight at most")
+    with AnalysisExecutor(max_workers=args.workers) as executor, \
+            ThreadPoolExecutor(max_workers=args.concurrency) as fetch_executor, \
+            ThreadPoolExecutor(max_workers=args.parallel_sites) as site_executor:
+        try:
+            futures = [site_executor.submit(run_site, url) for url in sites]
+            for done, future in enumerate(as_completed(futures), 1):
+                outcome = future.result()
+                outcomes.append(outcome)
+                print(f"[{done}/{len(sites)}] {outcome['url']}: {outcome['status']}")
+        finally:
+            for future in futures:
+                future.cancel()
+            elapsed = time.monotonic() - started
+            pages = sum(outcome.get('pages', 0) for outcome in outcomes)
+            with open(summary_path, 'w') as file:
+                json.dump({
+                    "sites": len(sites),
+                    "completed": sum(1 for outcome in outcomes if outcome['status'] == 'ok'),
+                    "failed": sum(1 for outcome in outcomes if outcome['status'] == 'error'),
+                    "pages": pages,
+                    "seconds": round(elapsed, 3),
+                    "pages_per_second": round(pages / elapsed, 2) if elapsed else None,
+                    "depth": args.depth,
+                    "concurrency": args.concurrency,
+                    "parallel_sites": args.parallel_sites,
+                    "results": outcomes,
+                }, file, indent=2)
+    http_client.close_sessions()
+    print(f"Run summary saved to: {summary_path}")
+
+
 def main():
+    args = parse_args()
+    if args.parser is not None:
+        set_default_backend(args.parser)
+    if args.sites:
+        run_batch(args)
+        return
+
     # Get input from user
     url_to_crawl = input("Please enter the URL to crawl: ")
 
@@ -44,40 +302,18 @@ def main():
         url_to_crawl = input("Please enter the URL to crawl: ")
 
     # Ensure the URL has the correct scheme (http:// or https://)
-    if not url_to_crawl.startswith(('http://', 'https://')):
-        user_agent = get_random_user_agent()
-        headers = {"User-Agent": user_agent}
-        try:
-            response = requests.head('https://' + url_to_crawl, headers=headers)
-            if response.status_code < 400:  # if the server responds okay
-                url_to_crawl = 'https://' + url_to_crawl
-            else:
-                url_to_crawl = 'http://' + url_to_crawl
-        except requests.ConnectionError:
-            url_to_crawl = 'http://' + url_to_crawl
-
-    max_depth = int(input("Please enter the maximum depth to crawl (e.g., 2): "))
-
-    # Crawl the website and get sitemap
-    crawler = Crawler(url_to_crawl, max_depth)
-    sitemap_data = crawler.crawl()
-
-    # Save the sitemap
-    sitemap_filepath = crawler.save_sitemap()
-    main_save_directory = os.path.dirname(sitemap_filepath)
-
-    # Extracting keywords
-    keywords = extract_keywords(sitemap_data)
-
-    # Running URL Optimization Analysis
-    url_optimization_analysis(sitemap_data, keywords, main_save_directory)
+    url_to_crawl = resolve_scheme(url_to_crawl)
 
-    # Running Content Organization Strategy Analysis
-    content_organization_strategy(sitemap_data, main_save_directory)
+    if args.depth is not None:
+        max_depth = args.depth
+    else:
+        max_depth = int(input("Please enter the maximum depth to crawl (e.g., 2): "))
 
-    # Running Content Analysis Input
-    content_analysis_input(sitemap_data, main_save_directory)
+    with AnalysisExecutor(max_workers=args.workers) as executor:
+        sitemap_filepath, results_path, crawler = crawl_site(url_to_crawl, max_depth, args, executor)
 
+    if args.result_store != 'json':
+        print(f"Analysis results saved to: {results_path}")
     print(f"Sitemap saved to: {sitemap_filepath}")
 
 
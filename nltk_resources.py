@@ -0,0 +1,152 @@
+# nltk_resources.py
+#
+# Lazy, offline access to the NLTK models seo_analyzer needs.
+#
+# Nothing here imports nltk or touches the network at import time. Each resource
+# is looked up in the local NLTK data directories the first time it is used and
+# then kept as a process-wide singleton. Missing data raises LookupError instead
+# of downloading, unless SEO_NLTK_DOWNLOAD=1 is set. Fetch everything up front with:
+#
+#   python nltk_resources.py [--data-dir DIR]
+
+import argparse
+import functools
+import os
+import threading
+
+# Extra data directory searched before NLTK's defaults, and the download target
+DATA_DIR_ENV = 'SEO_NLTK_DATA'
+# Set to 1 to let a missing resource be downloaded on first use
+DOWNLOAD_ENV = 'SEO_NLTK_DOWNLOAD'
+
+# name -> ((package, resource path) for NLTK >= 3.9, (package, resource path) before it)
+RESOURCES = {
+    'stopwords': (('stopwords', 'corpora/stopwords'),
+                  ('stopwords', 'corpora/stopwords')),
+    'punkt': (('punkt_tab', 'tokenizers/punkt_tab/english/'),
+              ('punkt', 'tokenizers/punkt/english.pickle')),
+    'tagger': (('averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger_eng/'),
+               ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger/averaged_perceptron_tagger.pickle')),
+    'ne_chunker': (('maxent_ne_chunker_tab', 'chunkers/maxent_ne_chunker_tab/english_ace_multiclass/'),
+                   ('maxent_ne_chunker', 'chunkers/maxent_ne_chunker/english_ace_multiclass.pickle')),
+    'words': (('words', 'corpora/words'),
+              ('words', 'corpora/words')),
+}
+
+_lock = threading.Lock()
+_verified = set()
+
+
+@functools.lru_cache(maxsize=None)
+def _nltk():
+    import nltk
+
+    data_dir = os.environ.get(DATA_DIR_ENV)
+    if data_dir and data_dir not in nltk.data.path:
+        nltk.data.path.insert(0, data_dir)
+    return nltk
+
+
+def _tab_format():
+    # NLTK 3.9 replaced the pickled models with plain-text "_tab" packages
+    import nltk.tokenize
+    return hasattr(nltk.tokenize, 'PunktTokenizer')
+
+
+def _package(name):
+    modern, legacy = RESOURCES[name]
+    return modern if _tab_format() else legacy
+
+
+def ensure(name, download=None):
+    """
+    Make sure the named resource is in a local NLTK data directory.
+
+    Raises LookupError when it is missing, unless download (default: the
+    SEO_NLTK_DOWNLOAD environment variable) allows fetching it.
+    """
+    if name in _verified:
+        return
+    nltk = _nltk()
+    package, path = _package(name)
+    with _lock:
+        if name in _verified:
+            return
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            if download is None:
+                download = os.environ.get(DOWNLOAD_ENV) == '1'
+            if not download:
+                raise LookupError(
+                    f"NLTK resource '{package}' is not installed. "
+                    f"Run 'python nltk_resources.py' or set {DOWNLOAD_ENV}=1.") from None
+            nltk.download(package, download_dir=os.environ.get(DATA_DIR_ENV), quiet=True)
+            nltk.data.find(path)
+        _verified.add(name)
+
+
+def ensure_all(download=None):
+    for name in RESOURCES:
+        ensure(name, download)
+
+
+@functools.lru_cache(maxsize=None)
+def get_stopwords(language='english'):
+    ensure('stopwords')
+    return frozenset(_nltk().corpus.stopwords.words(language))
+
+
+@functools.lru_cache(maxsize=None)
+def get_sentence_tokenizer():
+    ensure('punkt')
+    if _tab_format():
+        from nltk.tokenize import PunktTokenizer
+        return PunktTokenizer('english')
+    return _nltk().data.load(_package('punkt')[1])
+
+
+@functools.lru_cache(maxsize=None)
+def get_word_tokenizer():
+    from nltk.tokenize.destructive import NLTKWordTokenizer
+    return NLTKWordTokenizer()
+
+
+@functools.lru_cache(maxsize=None)
+def get_pos_tagger():
+    ensure('tagger')
+    from nltk.tag import PerceptronTagger
+    return PerceptronTagger()
+
+
+@functools.lru_cache(maxsize=None)
+def get_ne_chunker():
+    ensure('ne_chunker')
+    ensure('words')  # the chunker's features look words up in the basic English word list
+    nltk = _nltk()
+    if hasattr(nltk.chunk, 'ne_chunker'):
+        return nltk.chunk.ne_chunker()
+    return nltk.data.load(_package('ne_chunker')[1])
+
+
+def word_tokenize(text):
+    """
+    Same tokens as nltk.word_tokenize, using the cached sentence and word tokenizers.
+    """
+    word_tokenizer = get_word_tokenizer()
+    return [token for sentence in get_sentence_tokenizer().tokenize(text)
+            for token in word_tokenizer.tokenize(sentence)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Download the NLTK data used by seo_analyzer.")
+    parser.add_argument('--data-dir', help=f"Target directory (default: ${DATA_DIR_ENV} or NLTK's default)")
+    args = parser.parse_args()
+    if args.data_dir:
+        os.environ[DATA_DIR_ENV] = args.data_dir
+    ensure_all(download=True)
+    print(f"NLTK resources ready: {', '.join(RESOURCES)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,222 @@
+# page_snapshot.py
+
+import os
+from html.parser import HTMLParser
+
+HEADING_TAGS = {'h1': 1, 'h2': 2, 'h3': 3, 'h4': 4, 'h5': 5, 'h6': 6}
+# Elements whose content is never rendered as page text
+HIDDEN_TAGS = {'script', 'style', 'template'}
+JSON_LD_TYPE = 'application/ld+json'
+
+
+class PageSnapshot:
+    """
+    Everything the analyses need from one page, extracted in a single walk of the document.
+
+    Holds only plain strings, lists and tuples, so snapshots are cheap to keep in the
+    page store and can be pickled to worker processes.
+    """
+
+    def __init__(self, url=""):
+        self.url = url
+        self.title = None
+        self.meta_description = None
+        self.meta_keywords = []
+        self.headings = []  # (level, text) in document order
+        self.section_count = 0
+        self.images = []  # (src, alt)
+        self.json_ld = []
+        self.links = []
+        self.text = ""
+
+    def compact(self):
+        """
+        Return a copy without the visible text and links, the bulky parts, for shipping to worker processes.
+        """
+        copy = PageSnapshot(self.url)
+        copy.__dict__.update(self.__dict__)
+        copy.text = ""
+        copy.links = []
+        return copy
+
+    @property
+    def h1(self):
+        return [text for level, text in self.headings if level == 1]
+
+    def handle_start(self, tag, attrs):
+        """
+        Record the attribute-only data of a start tag; shared by the tree-walking backends.
+        """
+        if tag == 'meta':
+            name = (attrs.get('name') or '').lower()
+            if name == 'description' and self.meta_description is None:
+                self.meta_description = attrs.get('content') or ""
+            elif name == 'keywords':
+                self.meta_keywords.append(attrs.get('content') or "")
+        elif tag == 'a':
+            if attrs.get('href'):
+                self.links.append(attrs['href'])
+        elif tag == 'img':
+            self.images.append((attrs.get('src'), attrs.get('alt')))
+        elif tag == 'section':
+            self.section_count += 1
+
+
+class _SnapshotParser(HTMLParser):
+    """
+    Streaming extractor on the standard-library tokenizer: no tree is ever built.
+    """
+
+    def __init__(self, snapshot):
+        super().__init__(convert_charrefs=True)
+        self.snapshot = snapshot
+        self.text_parts = []
+        self.hidden_depth = 0
+        self.title_parts = None
+        self.heading = None  # (level, parts) of the heading being read
+        self.json_ld_parts = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        self.snapshot.handle_start(tag, attrs)
+        if tag in HIDDEN_TAGS:
+            self.hidden_depth += 1
+            if tag == 'script' and (attrs.get('type') or '').lower() == JSON_LD_TYPE:
+                self.json_ld_parts = []
+        elif tag == 'title' and self.snapshot.title is None:
+            self.title_parts = []
+        elif tag in HEADING_TAGS and self.heading is None:
+            self.heading = (HEADING_TAGS[tag], [])
+
+    def handle_endtag(self, tag):
+        if tag in HIDDEN_TAGS:
+            self.hidden_depth = max(0, self.hidden_depth - 1)
+            if tag == 'script' and self.json_ld_parts is not None:
+                self.snapshot.json_ld.append("".join(self.json_ld_parts))
+                self.json_ld_parts = None
+        elif tag == 'title' and self.title_parts is not None:
+            self.snapshot.title = "".join(self.title_parts)
+            self.title_parts = None
+        elif self.heading is not None and HEADING_TAGS.get(tag) == self.heading[0]:
+            self.snapshot.headings.append((self.heading[0], "".join(self.heading[1]).strip()))
+            self.heading = None
+
+    def handle_data(self, data):
+        if self.hidden_depth:
+            if self.json_ld_parts is not None:
+                self.json_ld_parts.append(data)
+            return
+        self.text_parts.append(data)
+        if self.title_parts is not None:
+            self.title_parts.append(data)
+        if self.heading is not None:
+            self.heading[1].append(data)
+
+    def close(self):
+        super().close()
+        if self.title_parts is not None:
+            self.snapshot.title = "".join(self.title_parts)
+        self.snapshot.text = "".join(self.text_parts)
+
+
+def _extract_html_parser(url, html):
+    snapshot = PageSnapshot(url)
+    parser = _SnapshotParser(snapshot)
+    parser.feed(html)
+    parser.close()
+    return snapshot
+
+
+def _extract_lxml(url, html):
+    import lxml.html
+    from lxml import etree
+
+    snapshot = PageSnapshot(url)
+    if not html.strip():
+        return snapshot
+    parser = lxml.html.HTMLParser(encoding='utf-8')
+    try:
+        root = lxml.html.document_fromstring(html.encode('utf-8'), parser=parser)
+    except etree.ParserError:
+        return snapshot
+    for element in root.iter():
+        tag = element.tag
+        if not isinstance(tag, str):
+            continue  # comments and processing instructions
+        snapshot.handle_start(tag, element.attrib)
+        if tag == 'title' and snapshot.title is None:
+            snapshot.title = element.text_content()
+        elif tag in HEADING_TAGS:
+            snapshot.headings.append((HEADING_TAGS[tag], element.text_content().strip()))
+        elif tag == 'script' and (element.get('type') or '').lower() == JSON_LD_TYPE:
+            snapshot.json_ld.append(element.text or "")
+    etree.strip_elements(root, *HIDDEN_TAGS, with_tail=False)
+    snapshot.text = root.text_content()
+    return snapshot
+
+
+def _extract_selectolax(url, html):
+    from selectolax.lexbor import LexborHTMLParser
+
+    snapshot = PageSnapshot(url)
+    tree = LexborHTMLParser(html)
+    if tree.root is None:
+        return snapshot
+    for node in tree.root.traverse(include_text=False):
+        tag = node.tag
+        attrs = node.attributes
+        snapshot.handle_start(tag, attrs)
+        if tag == 'title' and snapshot.title is None:
+            snapshot.title = node.text(deep=True)
+        elif tag in HEADING_TAGS:
+            snapshot.headings.append((HEADING_TAGS[tag], node.text(deep=True).strip()))
+        elif tag == 'script' and (attrs.get('type') or '').lower() == JSON_LD_TYPE:
+            snapshot.json_ld.append(node.text(deep=True))
+    tree.strip_tags(list(HIDDEN_TAGS))
+    snapshot.text = tree.root.text(deep=True, separator='')
+    return snapshot
+
+
+BACKENDS = {
+    'lxml': _extract_lxml,
+    'selectolax': _extract_selectolax,
+    'html.parser': _extract_html_parser,
+}
+
+
+def available_backends():
+    """
+    Return the names of the backends whose parser library is installed.
+    """
+    available = []
+    for name, module in (('lxml', 'lxml.html'), ('selectolax', 'selectolax.lexbor')):
+        try:
+            __import__(module)
+            available.append(name)
+        except ImportError:
+            pass
+    available.append('html.parser')
+    return available
+
+
+# The fastest installed backend, unless SEO_PARSER names one
+DEFAULT_BACKEND = os.environ.get('SEO_PARSER') if os.environ.get('SEO_PARSER') in BACKENDS else available_backends()[0]
+
+
+def set_default_backend(name):
+    """
+    Parse with backend name from now on, in this process and in worker processes it starts later.
+    """
+    global DEFAULT_BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}. Choose from {', '.join(BACKENDS)}")
+    DEFAULT_BACKEND = name
+    # Spawned workers import this module afresh and read the choice from the environment
+    os.environ['SEO_PARSER'] = name
+
+
+def extract_snapshot(url, html, backend=None):
+    """
+    Parse html once with the chosen backend (DEFAULT_BACKEND if None) and return its PageSnapshot.
+    """
+    return BACKENDS[backend or DEFAULT_BACKEND](url, html)
@@ -0,0 +1,139 @@
+# page_store.py
+
+import hashlib
+import threading
+import time
+import requests
+from requests.structures import CaseInsensitiveDict
+import retry_policy
+from urls_utils import headers
+from page_snapshot import extract_snapshot
+
+
+class Page:
+    """
+    A fetched page: body, status, headers and timing, kept so every analysis stage can reuse it.
+    """
+
+    def __init__(self, url, status_code=None, headers=None, text="", elapsed=0.0, error=None):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.text = text
+        self.elapsed = elapsed
+        self.error = error
+        self.fetched_at = time.time()
+        self.from_cache = False
+        self._content_hash = None
+        self._snapshot = None
+
+    @classmethod
+    def from_response(cls, url, response):
+        return cls(url,
+                   status_code=response.status_code,
+                   headers=response.headers,
+                   text=response.text,
+                   elapsed=response.elapsed.total_seconds())
+
+    @classmethod
+    def from_error(cls, url, error):
+        return cls(url, error=str(error))
+
+    @property
+    def content_hash(self):
+        if self._content_hash is None:
+            self._content_hash = hashlib.sha256(self.text.encode('utf-8')).hexdigest()
+        return self._content_hash
+
+    def snapshot(self):
+        """
+        Return the PageSnapshot of this page, parsing the body on first use only.
+        """
+        if self._snapshot is None:
+            self._snapshot = extract_snapshot(self.url, self.text)
+        return self._snapshot
+
+    @property
+    def ok(self):
+        return self.error is None and self.status_code is not None and self.status_code < 400
+
+    def raise_for_status(self):
+        if self.error is not None:
+            raise requests.RequestException(self.error)
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}")
+
+
+class PageStore:
+    """
+    Thread-safe store of fetched pages keyed by URL.
+
+    The crawler fills it while crawling; analysis functions read from it and
+    only go to the network for pages that were never fetched. When an HttpCache
+    is attached, per-page analysis results are reused for unchanged content.
+    """
+
+    def __init__(self, timeout=10, cache=None):
+        self.timeout = timeout
+        self.cache = cache
+        self.pages = {}
+        self.lock = threading.Lock()
+
+    def add(self, page):
+        with self.lock:
+            self.pages[page.url] = page
+
+    def get(self, url):
+        with self.lock:
+            return self.pages.get(url)
+
+    def __contains__(self, url):
+        with self.lock:
+            return url in self.pages
+
+    def __len__(self):
+        with self.lock:
+            return len(self.pages)
+
+    def fetch(self, url):
+        """
+        Return the stored page for url, fetching it once if it is missing.
+        Raises requests.RequestException if the page could not be retrieved.
+        """
+        page = self.get(url)
+        if page is None:
+            try:
+                response = retry_policy.get(url, headers=headers, timeout=self.timeout)
+                page = Page.from_response(url, response)
+            except requests.RequestException as e:
+                page = Page.from_error(url, e)
+            self.add(page)
+        page.raise_for_status()
+        return page
+
+    def get_analysis(self, page, kind):
+        """
+        Return a previously stored analysis result for this exact page content, or None.
+        """
+        if self.cache is None:
+            return None
+        return self.cache.get_analysis(page.url, kind, page.content_hash)
+
+    def put_analysis(self, page, kind, result):
+        if self.cache is not None:
+            self.cache.put_analysis(page.url, kind, page.content_hash, result)
+
+
+def _snapshot_task(payload):
+    url, text = payload
+    return extract_snapshot(url, text)
+
+
+def ensure_snapshots(pages, executor):
+    """
+    Parse every page that has no snapshot yet, fanning the parsing out through an AnalysisExecutor.
+    """
+    missing = [page for page in pages if page._snapshot is None]
+    snapshots = executor.map(_snapshot_task, [(page.url, page.text) for page in missing])
+    for page, snapshot in zip(missing, snapshots):
+        page._snapshot = snapshot
@@ -0,0 +1,355 @@
+# politeness.py
+
+import collections
+import heapq
+import itertools
+import re
+import threading
+import time
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+import requests
+import retry_policy
+from urls_utils import headers
+
+# Seconds between requests to one host when its robots.txt sets no Crawl-delay
+DEFAULT_CRAWL_DELAY = 0.1
+# Longest Crawl-delay honoured; larger values would stall a crawl for hours
+MAX_CRAWL_DELAY = 30
+# How long a robots.txt is trusted, and how soon one that failed to load is tried again
+ROBOTS_TTL = 24 * 3600
+ROBOTS_ERROR_TTL = 300
+
+# RobotFileParser only accepts whole seconds, so Crawl-delay is handed to it in milliseconds
+_CRAWL_DELAY_LINE = re.compile(r"^(\s*crawl-delay\s*:\s*)(\d*\.?\d+)", re.IGNORECASE)
+
+
+def origin_of(url):
+    """
+    scheme://host[:port] of url; robots.txt and rate limits apply per origin.
+    """
+    parts = urlsplit(url)
+    return f"{parts.scheme.lower()}://{parts.netloc.lower()}"
+
+
+class TokenBucket:
+    """
+    Allows rate requests per second on average, in bursts of at most capacity.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+        self._acquired = None  # (tokens left, time) after the last acquire
+
+    def _refill(self):
+        now = self.clock()
+        if self.rate is None:
+            self.tokens = self.capacity
+        else:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self):
+        """
+        Seconds until a token is available (0 if one is available now).
+        """
+        self._refill()
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def try_acquire(self):
+        """
+        Take a token if one is available and return True, else return False.
+        """
+        if self.wait_time() > 0:
+            return False
+        self.tokens -= 1
+        self._acquired = (self.tokens, self.updated)
+        return True
+
+    def set_rate(self, rate):
+        """
+        Change the rate, counting the time since the last acquire at the new rate.
+        """
+        self.rate = rate
+        if self._acquired is not None:
+            self.tokens, self.updated = self._acquired
+        self._refill()
+
+
+class RobotsCache:
+    """
+    Parsed robots.txt per origin, fetched on first use and kept for ttl seconds.
+
+    Follows RFC 9309 for unavailable files: a 4xx response allows everything,
+    while a 5xx response or a network failure disallows everything until the
+    file is tried again after error_ttl seconds; unreachable() tells these
+    apart from files that really disallow a URL. While the host's circuit
+    breaker is open nothing is cached, and the CircuitOpenError is raised to
+    the caller so it can try again later. Concurrent lookups for one origin
+    share a single fetch.
+    """
+
+    def __init__(self, user_agent=headers['User-Agent'], timeout=10, ttl=ROBOTS_TTL, error_ttl=ROBOTS_ERROR_TTL,
+                 fetch=None, clock=time.monotonic):
+        self.user_agent = user_agent
+        self.timeout = timeout
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.fetch = fetch or self._fetch
+        self.clock = clock
+        self._parsers = {}  # origin -> (parser, expires, whether robots.txt could be fetched)
+        self._origin_locks = collections.defaultdict(threading.Lock)
+        self.lock = threading.Lock()
+
+    def _fetch(self, robots_url):
+        """
+        Return (status code, body) for robots_url; raises requests.RequestException on failure.
+        """
+        response = retry_policy.get(robots_url, timeout=self.timeout, headers=headers)
+        return response.status_code, response.text
+
+    def _load(self, origin):
+        parser = RobotFileParser(origin + '/robots.txt')
+        try:
+            status_code, text = self.fetch(parser.url)
+        except retry_policy.CircuitOpenError:
+            # Nothing was sent, so there is no answer to cache
+            raise
+        except requests.RequestException:
+            status_code, text = None, ''
+        if status_code is not None and 200 <= status_code < 300:
+            parser.parse(_CRAWL_DELAY_LINE.sub(lambda match: f"{match.group(1)}{round(float(match.group(2)) * 1000)}",
+                                               line) for line in text.splitlines())
+            return parser, self.ttl, True
+        if status_code is not None and 400 <= status_code < 500:
+            parser.allow_all = True
+            return parser, self.ttl, True
+        parser.disallow_all = True
+        return parser, self.error_ttl, False
+
+    def _entry(self, url):
+        with self.lock:
+            entry = self._parsers.get(origin_of(url))
+        if entry is None or entry[1] <= self.clock():
+            return None
+        return entry
+
+    def cached(self, url):
+        """
+        The parser for url's origin if it is loaded and fresh, without fetching; else None.
+        """
+        entry = self._entry(url)
+        return entry[0] if entry is not None else None
+
+    def unreachable(self, url):
+        """
+        True if url's origin is disallowed only because its robots.txt could not be fetched.
+        """
+        entry = self._entry(url)
+        return entry is not None and not entry[2]
+
+    def get(self, url):
+        """
+        The parser for url's origin, fetching robots.txt if needed.
+        Raises CircuitOpenError if the origin's circuit breaker is open.
+        """
+        parser = self.cached(url)
+        if parser is not None:
+            return parser
+        origin = origin_of(url)
+        with self.lock:
+            origin_lock = self._origin_locks[origin]
+        with origin_lock:
+            parser = self.cached(url)
+            if parser is None:
+                parser, ttl, fetched = self._load(origin)
+                with self.lock:
+                    self._parsers[origin] = (parser, self.clock() + ttl, fetched)
+        return parser
+
+    def allowed(self, url):
+        return self.get(url).can_fetch(self.user_agent, url)
+
+    def crawl_delay(self, url, parser=None):
+        """
+        Seconds to wait between requests to url's origin according to its robots.txt, or None.
+        Request-rate is honoured too; the stricter of the two wins, capped at MAX_CRAWL_DELAY.
+        """
+        parser = parser or self.get(url)
+        delays = []
+        crawl_delay = parser.crawl_delay(self.user_agent)
+        if crawl_delay is not None:
+            delays.append(crawl_delay / 1000)
+        request_rate = parser.request_rate(self.user_agent)
+        if request_rate is not None and request_rate.requests:
+            delays.append(request_rate.seconds / request_rate.requests)
+        if not delays:
+            return None
+        return min(max(delays), MAX_CRAWL_DELAY)
+
+
+class _Host:
+    __slots__ = ('queue', 'bucket', 'active', 'scheduled', 'delay_known')
+
+    def __init__(self, bucket):
+        self.queue = collections.deque()  # (url, depth)
+        self.bucket = bucket
+        self.active = 0
+        self.scheduled = False
+        self.delay_known = False
+
+
+class PoliteScheduler:
+    """
+    Hands out URLs from a Frontier so that no host is fetched faster than it allows.
+
+    Up to lookahead URLs are pulled from the frontier into per-host queues. Each
+    host has a TokenBucket refilled at 1 / delay tokens per second, where delay
+    is the host's robots.txt Crawl-delay or default_delay, and at most
+    max_per_host of its URLs are in flight at once. Hosts are kept in a heap by
+    the time they may next be fetched, so pop() interleaves many hosts and
+    aggregate throughput grows with the number of hosts while each one sees a
+    bounded rate.
+
+    With a RobotsCache, URLs that robots.txt disallows are passed to
+    on_disallowed instead of being handed out. Only robots.txt files that are
+    already loaded are consulted here; fetchers call robots.allowed() for the
+    rest, and report back through done().
+    """
+
+    def __init__(self, frontier, robots=None, default_delay=DEFAULT_CRAWL_DELAY, max_per_host=2, lookahead=1000,
+                 on_disallowed=None, clock=time.monotonic):
+        self.frontier = frontier
+        self.robots = robots
+        self.default_delay = default_delay
+        self.max_per_host = max_per_host
+        self.lookahead = lookahead
+        self.on_disallowed = on_disallowed
+        self.clock = clock
+        self._hosts = {}  # origin -> _Host
+        self._ready = []  # heap of (time the host may be fetched, tiebreak, origin)
+        self._counter = itertools.count()
+        self._buffered = 0
+        self.disallowed = 0
+        self.lock = threading.Lock()
+
+    def _rate(self, delay):
+        return 1.0 / delay if delay else None
+
+    def _host(self, origin):
+        host = self._hosts.get(origin)
+        if host is None:
+            host = _Host(TokenBucket(self._rate(self.default_delay), clock=self.clock))
+            self._hosts[origin] = host
+        return host
+
+    def _update_delay(self, host, url, parser):
+        if host.delay_known or parser is None:
+            return
+        host.delay_known = True
+        delay = self.robots.crawl_delay(url, parser)
+        if delay is not None:
+            host.bucket.set_rate(self._rate(max(delay, self.default_delay or 0)))
+
+    def _schedule(self, origin, host):
+        # Until its robots.txt is loaded, a host gets one request at a time, so its
+        # Crawl-delay is known before a second one is sent
+        limit = self.max_per_host if host.delay_known or self.robots is None else 1
+        if host.scheduled or not host.queue or host.active >= limit:
+            return
+        host.scheduled = True
+        heapq.heappush(self._ready, (self.clock() + host.bucket.wait_time(), next(self._counter), origin))
+
+    def _allowed(self, host, url, depth):
+        """
+        False (after reporting url to on_disallowed) if an already loaded robots.txt disallows url.
+        """
+        if self.robots is None:
+            return True
+        parser = self.robots.cached(url)
+        self._update_delay(host, url, parser)
+        if parser is None or parser.can_fetch(self.robots.user_agent, url):
+            return True
+        self.disallowed += 1
+        if self.on_disallowed is not None:
+            self.on_disallowed(url, depth)
+        return False
+
+    def _refill(self):
+        while self._buffered < self.lookahead:
+            entry = self.frontier.pop()
+            if entry is None:
+                return
+            url, depth = entry
+            origin = origin_of(url)
+            host = self._host(origin)
+            if not self._allowed(host, url, depth):
+                continue
+            host.queue.append((url, depth))
+            self._buffered += 1
+            self._schedule(origin, host)
+
+    def pop(self):
+        """
+        Return the next (url, depth) that may be fetched now, or None.
+        Call done(url) once it has been fetched.
+        """
+        with self.lock:
+            self._refill()
+            while self._ready:
+                ready_at, _, origin = self._ready[0]
+                if ready_at > self.clock():
+                    return None
+                heapq.heappop(self._ready)
+                host = self._hosts[origin]
+                host.scheduled = False
+                if host.bucket.wait_time() > 0:
+                    # Its rate was lowered since it was scheduled
+                    self._schedule(origin, host)
+                    continue
+                url, depth = host.queue.popleft()
+                self._buffered -= 1
+                # robots.txt may have been loaded since url was queued
+                if not self._allowed(host, url, depth):
+                    self._schedule(origin, host)
+                    continue
+                host.bucket.try_acquire()
+                host.active += 1
+                self._schedule(origin, host)
+                return url, depth
+            return None
+
+    def done(self, url):
+        """
+        Release url's host slot and pick up its Crawl-delay if robots.txt was loaded meanwhile.
+        """
+        origin = origin_of(url)
+        with self.lock:
+            host = self._hosts[origin]
+            host.active -= 1
+            if self.robots is not None:
+                self._update_delay(host, url, self.robots.cached(url))
+            self._schedule(origin, host)
+
+    def wait_time(self):
+        """
+        Seconds until pop() may return a URL, 0 if it may now, or None if no URL is waiting for a host.
+        """
+        with self.lock:
+            self._refill()
+            if not self._ready:
+                return None
+            return max(0.0, self._ready[0][0] - self.clock())
+
+    def __len__(self):
+        with self.lock:
+            return self._buffered + len(self.frontier)
+
+    def __bool__(self):
+        return len(self) > 0
@@ -0,0 +1,113 @@
+# readability.py
+
+import functools
+import re
+import string
+import numpy as np
+
+# Text preparation identical to textatistic.punct_clean, with the regexes compiled once
+_DECIMAL = re.compile(r"\.([0-9])")
+_RHETORICAL_END = re.compile(r'[\?!]+\)[\.\?!]+')
+_RHETORICAL_DASH = re.compile(r'[\?!]+\)\s*[\-]+')
+_PUNCTUATION = str.maketrans("", "", string.punctuation)
+
+
+def interpret_readability(readability_score):
+    """
+    Return the (interpretation, recommendations) bucket for a Flesch reading-ease score.
+    """
+    if readability_score < 0:
+        return "Extremely difficult to read.", ["Check for complex sentences and lack of punctuation.",
+                                               "Consider simplifying the language."]
+    elif readability_score < 30:
+        return "Difficult to read.", ["Simplify sentences and use more common words."]
+    elif readability_score < 60:
+        return "Moderately difficult to read.", ["Consider breaking up long sentences."]
+    return "Easy to read.", []
+
+
+class ReadabilityEngine:
+    """
+    Batch replacement for Textatistic that scores many documents in one call.
+
+    Counting follows Textatistic exactly (same cleaning, word split and hyphenation
+    dictionary). Syllable counts go through an LRU-bounded per-word cache, so common
+    words are hyphenated once per process instead of once per page. The scores are
+    then computed for the whole batch as NumPy arrays.
+    """
+
+    def __init__(self, syllable_cache_size=200000):
+        # Imported here: creating the hyphenation dictionary is slow and may need a download
+        from hyphen import Hyphenator
+        from textatistic.textatistic import Abbreviations
+
+        self._hyphenator = Hyphenator('en_US')
+        self._abbreviations = [(re.compile(old[2:-1]), new) if old[:2] in ["r'", 'r"'] else (old, new)
+                               for old, new in Abbreviations().list]
+        self.syllables = functools.lru_cache(maxsize=syllable_cache_size)(self._count_syllables)
+
+    def _count_syllables(self, word):
+        return max(1, len(self._hyphenator.syllables(word)))
+
+    def _clean(self, text):
+        text = text.replace("–", "-").replace("—", "-")
+        text = text.replace("co-", "co").replace("Co-", "Co")
+        text = _DECIMAL.sub("+\\1", text)
+        text = _RHETORICAL_END.sub(').', text)
+        text = _RHETORICAL_DASH.sub(') -', text)
+        for old, new in self._abbreviations:
+            text = old.sub(new, text) if hasattr(old, 'sub') else text.replace(old, new)
+        return text
+
+    def counts(self, text):
+        """
+        Return (sentences, words, syllables, polysyllabic words) for one document.
+        """
+        text = self._clean(text)
+        sentences = text.count('.') + text.count('!') + text.count('?')
+        words = text.replace("-", ' ').translate(_PUNCTUATION).split()
+        syllables = 0
+        polysyllables = 0
+        for word in words:
+            count = self.syllables(word)
+            syllables += count
+            if count >= 3:
+                polysyllables += 1
+        return sentences, len(words), syllables, polysyllables
+
+    def score_many(self, texts):
+        """
+        Score a batch of documents. Returns a dict of arrays, one entry per document:
+        the raw counts plus flesch, fleschkincaid, gunningfog and smog scores. Documents
+        without a sentence or a word get NaN scores where Textatistic would divide by zero.
+        """
+        counts = np.array([self.counts(text) for text in texts], dtype=float).reshape(-1, 4)
+        sentences, words, syllables, polysyllables = counts.T
+        with np.errstate(divide='ignore', invalid='ignore'):
+            words_per_sentence = np.where(sentences > 0, words / sentences, np.nan)
+            syllables_per_word = np.where(words > 0, syllables / words, np.nan)
+            polysyllables_per_word = np.where(words > 0, polysyllables / words, np.nan)
+            polysyllables_per_sentence = np.where(sentences > 0, polysyllables / sentences, np.nan)
+        return {
+            'sent_count': sentences,
+            'word_count': words,
+            'sybl_count': syllables,
+            'polysyblword_count': polysyllables,
+            'flesch_score': 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word,
+            'fleschkincaid_score': -15.59 + 0.39 * words_per_sentence + 11.8 * syllables_per_word,
+            'gunningfog_score': 0.4 * (words_per_sentence + 100 * polysyllables_per_word),
+            'smog_score': 3.1291 + 1.0430 * np.sqrt(30 * polysyllables_per_sentence),
+        }
+
+
+_engine = None
+
+
+def get_engine():
+    """
+    Return this process's shared ReadabilityEngine, so its syllable cache is reused across batches.
+    """
+    global _engine
+    if _engine is None:
+        _engine = ReadabilityEngine()
+    return _engine
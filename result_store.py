@@ -0,0 +1,272 @@
+# result_store.py
+
+import bisect
+import glob
+import json
+import os
+import sqlite3
+import threading
+from urls_utils import sanitize_url_for_directory
+
+
+class ResultStore:
+    """
+    Per-page analysis results, keyed by (url, analysis).
+
+    Writes are buffered and stored in batches of batch_size rows; flush() writes
+    whatever is pending. Writing the same (url, analysis) again replaces the
+    earlier result. Backends implement _write_batch, get, iter_results and analyses.
+    """
+
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.lock = threading.Lock()
+        self._pending = []  # (url, analysis, result)
+
+    def put(self, url, analysis, result):
+        with self.lock:
+            self._pending.append((url, analysis, result))
+            if len(self._pending) < self.batch_size:
+                return
+            batch, self._pending = self._pending, []
+            self._write_batch(batch)
+
+    def put_many(self, analysis, items):
+        """
+        Store an iterable of (url, result) pairs for one analysis.
+        """
+        for url, result in items:
+            self.put(url, analysis, result)
+
+    def flush(self):
+        with self.lock:
+            batch, self._pending = self._pending, []
+            if batch:
+                self._write_batch(batch)
+
+    def _write_batch(self, batch):
+        raise NotImplementedError
+
+    def get(self, url, analysis):
+        """
+        Return the stored result for url and analysis, or None.
+        """
+        raise NotImplementedError
+
+    def iter_results(self, analysis):
+        """
+        Yield (url, result) for every page with a stored result for analysis.
+        """
+        raise NotImplementedError
+
+    def analyses(self):
+        raise NotImplementedError
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class SQLiteResultStore(ResultStore):
+    """
+    All results in one SQLite table with an index on (url, analysis). Each batch is one transaction.
+    """
+
+    def __init__(self, path, batch_size=500):
+        super().__init__(batch_size)
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS results (
+                url TEXT,
+                analysis TEXT,
+                result TEXT,
+                PRIMARY KEY (url, analysis)
+            )""")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS results_by_analysis ON results (analysis)")
+        self.conn.commit()
+
+    def _write_batch(self, batch):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO results (url, analysis, result) VALUES (?, ?, ?)",
+                                  [(url, analysis, json.dumps(result)) for url, analysis, result in batch])
+
+    def get(self, url, analysis):
+        self.flush()
+        with self.lock:
+            row = self.conn.execute("SELECT result FROM results WHERE url = ? AND analysis = ?",
+                                    (url, analysis)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def iter_results(self, analysis):
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute("SELECT url, result FROM results WHERE analysis = ? ORDER BY rowid",
+                                     (analysis,)).fetchall()
+        for url, result in rows:
+            yield url, json.loads(result)
+
+    def analyses(self):
+        self.flush()
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT analysis FROM results ORDER BY analysis")]
+
+    def close(self):
+        super().close()
+        with self.lock:
+            self.conn.close()
+
+
+class ParquetResultStore(ResultStore):
+    """
+    Results as Parquet files under directory/<analysis>/, one part file per batch.
+
+    Rows in each part are sorted by URL and written in small row groups, so a
+    lookup by URL reads only the row groups whose URL range can contain it.
+    Parts are append-only; on lookup the newest part holding a URL wins.
+    """
+
+    def __init__(self, directory, batch_size=5000, row_group_size=1000):
+        super().__init__(batch_size)
+        self.path = self.directory = directory
+        self.row_group_size = row_group_size
+        self._url_ranges = {}  # part path -> [(first url, last url)] per row group
+        os.makedirs(directory, exist_ok=True)
+
+    def _parts(self, analysis):
+        return sorted(glob.glob(os.path.join(self.directory, glob.escape(analysis), 'part-*.parquet')))
+
+    def _write_batch(self, batch):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        by_analysis = {}
+        for url, analysis, result in batch:
+            by_analysis.setdefault(analysis, {})[url] = result  # the last write in a batch wins
+        for analysis, results in by_analysis.items():
+            analysis_directory = os.path.join(self.directory, analysis)
+            os.makedirs(analysis_directory, exist_ok=True)
+            urls = sorted(results)
+            table = pa.table({'url': urls, 'result': [json.dumps(results[url]) for url in urls]})
+            path = os.path.join(analysis_directory, f"part-{len(self._parts(analysis)):06d}.parquet")
+            pq.write_table(table, path, row_group_size=self.row_group_size)
+
+    def _row_group_ranges(self, path):
+        import pyarrow.parquet as pq
+
+        ranges = self._url_ranges.get(path)
+        if ranges is None:
+            metadata = pq.ParquetFile(path).metadata
+            ranges = []
+            for i in range(metadata.num_row_groups):
+                statistics = metadata.row_group(i).column(0).statistics
+                ranges.append((statistics.min, statistics.max))
+            self._url_ranges[path] = ranges
+        return ranges
+
+    def get(self, url, analysis):
+        import pyarrow.parquet as pq
+
+        self.flush()
+        for path in reversed(self._parts(analysis)):
+            for i, (first, last) in enumerate(self._row_group_ranges(path)):
+                if not first <= url <= last:
+                    continue
+                row_group = pq.ParquetFile(path).read_row_group(i, columns=['url', 'result'])
+                urls = row_group.column('url').to_pylist()
+                position = bisect.bisect_left(urls, url)
+                if position < len(urls) and urls[position] == url:
+                    return json.loads(row_group.column('result')[position].as_py())
+        return None
+
+    def iter_results(self, analysis):
+        import pyarrow.parquet as pq
+
+        self.flush()
+        seen = set()
+        for path in reversed(self._parts(analysis)):
+            for batch in pq.ParquetFile(path).iter_batches(columns=['url', 'result']):
+                for url, result in zip(batch.column('url').to_pylist(), batch.column('result').to_pylist()):
+                    if url not in seen:
+                        seen.add(url)
+                        yield url, json.loads(result)
+
+    def analyses(self):
+        self.flush()
+        return sorted(name for name in os.listdir(self.directory) if self._parts(name))
+
+
+class JsonResultStore(ResultStore):
+    """
+    The per-URL JSON layout: directory/<sanitized url>/<analysis>.json for every result,
+    plus directory/aggregated_<analysis>.json with all of an analysis's results, written on close.
+
+    Meant for exporting; get and iter_results only see results written through this instance.
+    """
+
+    def __init__(self, directory, batch_size=1):
+        super().__init__(batch_size)
+        self.path = self.directory = directory
+        self._results = {}  # analysis -> {url: result}
+
+    def _write_batch(self, batch):
+        for url, analysis, result in batch:
+            self._results.setdefault(analysis, {})[url] = result
+            # Create a subdirectory for this URL's analysis
+            url_subdir = os.path.join(self.directory, sanitize_url_for_directory(url))
+            os.makedirs(url_subdir, exist_ok=True)
+            with open(os.path.join(url_subdir, f'{analysis}.json'), 'w') as file:
+                json.dump(result, file, indent=2)
+
+    def get(self, url, analysis):
+        self.flush()
+        return self._results.get(analysis, {}).get(url)
+
+    def iter_results(self, analysis):
+        self.flush()
+        yield from list(self._results.get(analysis, {}).items())
+
+    def analyses(self):
+        self.flush()
+        return sorted(self._results)
+
+    def close(self):
+        super().close()
+        for analysis, results in self._results.items():
+            with open(os.path.join(self.directory, f'aggregated_{analysis}.json'), 'w') as file:
+                json.dump(list(results.values()), file, indent=2)
+
+
+BACKENDS = {
+    'sqlite': SQLiteResultStore,
+    'parquet': ParquetResultStore,
+    'json': JsonResultStore,
+}
+
+
+def open_result_store(path, backend=None):
+    """
+    Open a result store. Without a backend name it is picked from the path:
+    .db/.sqlite/.sqlite3 files are SQLite, anything else is a Parquet directory.
+    """
+    if backend is None:
+        backend = 'sqlite' if path.endswith(('.db', '.sqlite', '.sqlite3')) else 'parquet'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown result store backend: {backend}. Choose from {', '.join(BACKENDS)}")
+    return BACKENDS[backend](path)
+
+
+def export_json(store, directory, analyses=None):
+    """
+    Write a store's results out in the per-URL JSON layout under directory.
+    """
+    with JsonResultStore(directory) as export:
+        for analysis in analyses or store.analyses():
+            export.put_many(analysis, store.iter_results(analysis))
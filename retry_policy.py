@@ -0,0 +1,206 @@
+# retry_policy.py
+
+import email.utils
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+import requests
+import http_client
+
+# Responses worth asking for again; any other status is final
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# Responses that say the host as a whole is failing, not just the URL asked for
+HOST_FAILURE_STATUS = {502, 503, 504}
+
+# Transport failures that may succeed on another attempt. Malformed URLs, bad
+# schemes, too many redirects and certificate errors will not. (aiohttp's
+# counterparts live in async_crawler, so importing this module stays cheap.)
+RETRYABLE_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+FATAL_EXCEPTIONS = (requests.exceptions.SSLError, requests.exceptions.InvalidURL,
+                    requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema)
+
+
+class CircuitOpenError(requests.RequestException):
+    """
+    Raised instead of sending a request to a host whose circuit breaker is open.
+    """
+
+
+def host_of(url):
+    return urlsplit(url).netloc.lower()
+
+
+def is_retryable_status(status_code):
+    return status_code in RETRYABLE_STATUS
+
+
+def is_host_failure_status(status_code):
+    return status_code in HOST_FAILURE_STATUS
+
+
+def is_retryable_exception(exc, retryable=RETRYABLE_EXCEPTIONS, fatal=FATAL_EXCEPTIONS):
+    return isinstance(exc, retryable) and not isinstance(exc, fatal)
+
+
+def parse_retry_after(value, now=None):
+    """
+    Seconds to wait according to a Retry-After header (delta-seconds or HTTP-date), or None.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    now = now or datetime.now(timezone.utc)
+    return max(0.0, (when - now).total_seconds())
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After failure_threshold consecutive failed requests to a host its circuit
+    opens and requests to it fail at once with CircuitOpenError. A request
+    counts once however many attempts it took, and only when it ended in a
+    connection error, a timeout or a 502/503/504: a 500 or 404 from one broken
+    page says nothing about the rest of the host. After reset_timeout seconds
+    one trial request is let through: success closes the circuit, another
+    failure opens it again.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self._failures = {}  # host -> consecutive failures
+        self._opened_at = {}  # host -> when the circuit opened
+        self._trial = set()  # hosts with a half-open trial request in flight
+        self._lock = threading.Lock()
+
+    def before_request(self, url):
+        host = host_of(url)
+        with self._lock:
+            opened_at = self._opened_at.get(host)
+            if opened_at is None:
+                return
+            if host not in self._trial and self.clock() - opened_at >= self.reset_timeout:
+                self._trial.add(host)
+                return
+        raise CircuitOpenError(f"Circuit open for {host}: too many consecutive failures")
+
+    def record_success(self, url):
+        host = host_of(url)
+        with self._lock:
+            self._failures.pop(host, None)
+            self._opened_at.pop(host, None)
+            self._trial.discard(host)
+
+    def record_failure(self, url):
+        host = host_of(url)
+        with self._lock:
+            failures = self._failures.get(host, 0) + 1
+            self._failures[host] = failures
+            if host in self._trial or failures >= self.failure_threshold:
+                self._opened_at[host] = self.clock()
+            self._trial.discard(host)
+
+    def record_status(self, url, status_code):
+        if is_host_failure_status(status_code):
+            self.record_failure(url)
+        else:
+            self.record_success(url)
+
+    def release(self, url):
+        """
+        End a trial request that neither succeeded nor failed (e.g. an invalid URL), so another may be sent.
+        """
+        with self._lock:
+            self._trial.discard(host_of(url))
+
+    def is_open(self, url):
+        return host_of(url) in self._opened_at
+
+
+class RetryPolicy:
+    """
+    Retries for HTTP requests: only retryable errors are retried, with exponential
+    backoff and full jitter, and Retry-After is honored up to max_retry_after.
+
+    A shared CircuitBreaker makes requests to a host that keeps failing fail fast.
+    sleep and rand can be swapped out to test the policy without waiting.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=0.5, max_delay=30, max_retry_after=60, breaker=None,
+                 sleep=time.sleep, rand=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_retry_after = max_retry_after
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.sleep = sleep
+        self.rand = rand
+
+    def delay(self, attempt, headers=None):
+        """
+        Seconds to wait before retry number attempt (1-based).
+        """
+        retry_after = parse_retry_after(headers.get('Retry-After')) if headers is not None else None
+        if retry_after is not None:
+            return min(retry_after, self.max_retry_after)
+        return self.rand() * min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+
+    def request(self, method, url, **kwargs):
+        """
+        Send a request through this thread's http_client session, retrying as the policy allows.
+
+        Returns the last response, which may be an error status when it was final, the
+        attempts ran out. Raises the last requests.RequestException when no response was
+        received, or CircuitOpenError without sending anything while the host's circuit is open.
+        The circuit breaker sees the outcome of the request once, after its last attempt.
+        """
+        self.breaker.before_request(url)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                response = http_client.get_session().request(method, url, **kwargs)
+            except requests.RequestException as exc:
+                if not is_retryable_exception(exc):
+                    self.breaker.release(url)
+                    raise
+                if attempt >= self.max_attempts:
+                    self.breaker.record_failure(url)
+                    raise
+                self.sleep(self.delay(attempt))
+                continue
+            if not is_retryable_status(response.status_code) or attempt >= self.max_attempts:
+                self.breaker.record_status(url, response.status_code)
+                return response
+            response.close()
+            self.sleep(self.delay(attempt, response.headers))
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+
+# Shared by the crawler, the page store and the analyzers, so they all see the same circuit state
+default_policy = RetryPolicy()
+
+
+def get(url, **kwargs):
+    return default_policy.get(url, **kwargs)
+
+
+def head(url, **kwargs):
+    return default_policy.head(url, **kwargs)
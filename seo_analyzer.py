@@ -1,44 +1,44 @@
 # seo_analyzer.py
 
+import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import requests
-from bs4 import BeautifulSoup
-import nltk
-from nltk.tokenize import word_tokenize
-import googlesearch
+import retry_policy
+import nltk_resources
+import entity_engine
+import serp_rank
+from page_snapshot import extract_snapshot
 import json
-import time
 
-# Download necessary NLTK resources
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('averaged_perceptron_tagger')
-nltk.download('maxent_ne_chunker')
-nltk.download('words')
+# nltk and googlesearch (through serp_rank) are imported on first use: loading them (and
+# the NLTK models) at import time made every process, including pool workers, pay for them up front
 
 MAX_RETRIES = 3
-DELAY_BETWEEN_RETRIES = 5
+# Backoff with jitter, Retry-After and fail-fast for dead hosts, sharing the crawler's circuit breaker
+RETRY_POLICY = retry_policy.RetryPolicy(max_attempts=MAX_RETRIES, breaker=retry_policy.default_policy.breaker)
+
+HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
+}
 
 def robust_request(url, headers):
-    retries = 0
-    while retries < MAX_RETRIES:
-        try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            return response
-        except requests.RequestException:
-            retries += 1
-            time.sleep(DELAY_BETWEEN_RETRIES)
-    return None
+    """
+    Fetch url, retrying only failures that may go away. Returns None if it could not be loaded.
+    """
+    try:
+        response = RETRY_POLICY.get(url, headers=headers, timeout=10)
+        response.raise_for_status()
+        return response
+    except requests.RequestException:
+        return None
 
 def extract_named_entities(text):
-    words = nltk.word_tokenize(text)
-    tagged_words = nltk.pos_tag(words)
-    named_entities = nltk.chunk.ne_chunk(tagged_words)
-    entities = []
-    for entity in named_entities:
-        if isinstance(entity, nltk.Tree):
-            entities.append(" ".join([word for word, tag in entity.leaves()]))
-    return entities
+    """
+    Named entities in text, in order, from the first DEFAULT_CHAR_BUDGET characters.
+    Use entity_engine.EntityExtractor directly to analyze many pages in one batch.
+    """
+    return [entity for entity, label in entity_engine.get_extractor().extract(text, aggregate=False)]
 
 def generate_article_json_ld(title, author, publish_date, image_url, description):
     """Generate structured data for an article."""
@@ -53,8 +53,8 @@ def generate_article_json_ld(title, author, publish_date, image_url, description
     }
     return json_ld
 
-def seo_analysis(url):
-    results = {
+def empty_results():
+    return {
         'keywords': [],
         'good': [],
         'bad': [],
@@ -62,23 +62,29 @@ def seo_analysis(url):
         'named_entities': []
     }
 
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/58.0.3029.110 Safari/537.3"
-    }
-
-    # Use robust_request instead of direct requests.get
-    response = robust_request(url, headers)
-
-    if not response or response.status_code != 200:
-        results['bad'].append("Error: Unable to access the website.")
-        return results
-
-    soup = BeautifulSoup(response.content, 'html.parser')
+def keyword_frequencies(text, k=10):
+    """
+    The k most frequent non-stopword alphabetic words in text, as [(word, count), ...].
+    The tokenizers and the stopword frozenset are loaded once per process and reused.
+    """
+    stopwords = nltk_resources.get_stopwords()
+    counts = collections.Counter(word for word in map(str.lower, nltk_resources.word_tokenize(text))
+                                 if word not in stopwords and word.isalpha())
+    return counts.most_common(k)
+
+def analyze_page_content(url, html, on_keywords=None):
+    """
+    The CPU-bound part of seo_analysis: on-page checks, keyword frequencies and named entities.
+    Takes and returns plain data, so it can run in an AnalysisExecutor worker process.
+    on_keywords, if given, is called with the keywords as soon as they are known, before
+    the slower named-entity pass, so a rank lookup can start early.
+    """
+    results = empty_results()
+    snapshot = extract_snapshot(url, html)
 
     # Check for title and description
-    title = soup.find('title').get_text() if soup.find('title') else None
-    description_tag = soup.find('meta', attrs={'name': 'description'})
-    description = description_tag['content'] if description_tag else None
+    title = snapshot.title
+    description = snapshot.meta_description
 
     if title:
         results['good'].append("Title Exists! Great!")
@@ -91,38 +97,26 @@ def seo_analysis(url):
         results['bad'].append("Description does not exist! Add a Meta Description")
 
     # Extract heading information
-    if not soup.find('h1'):
+    if not snapshot.h1:
         results['bad'].append("No H1 found!")
 
     # Check images for alt attributes
-    for img in soup.find_all('img'):
-        if not img.get('alt'):
-            results['bad'].append(f"No Alt attribute for image: {img.get('src')}")
+    for src, alt in snapshot.images:
+        if not alt:
+            results['bad'].append(f"No Alt attribute for image: {src}")
 
     # Keyword analysis
-    body_text = soup.find('body').text
-    words = [word.lower() for word in word_tokenize(body_text)]
-    stopwords = nltk.corpus.stopwords.words('english')
-    filtered_words = [word for word in words if word not in stopwords and word.isalpha()]
-    freq_dist = nltk.FreqDist(filtered_words)
-    results['keywords'] = freq_dist.most_common(10)
+    body_text = snapshot.text
+    results['keywords'] = keyword_frequencies(body_text)
+    if on_keywords is not None:
+        on_keywords(results['keywords'])
 
     # Extract named entities
     entities = extract_named_entities(body_text)
     results['named_entities'] = entities
 
-    # Check Google Search rank for top keyword
-    search_results = list(googlesearch.search(results['keywords'][0][0], num_results=10))
-    if url in search_results:
-        results['good'].append(
-            f"The site appears in the top 10 Google results for its top keyword: {results['keywords'][0][0]}!")
-    else:
-        results['bad'].append(
-            f"The site does not appear in the top 10 Google results for its top keyword: {results['keywords'][0][0]}.")
-
     # Check for Schema Markup
-    scripts = soup.find_all('script', {'type': 'application/ld+json'})
-    if scripts:
+    if snapshot.json_ld:
         results['good'].append("Schema markup detected!")
     else:
         results['bad'].append("No schema markup detected.")
@@ -133,3 +127,127 @@ def seo_analysis(url):
         results['schema_suggestion'] = json_ld_script
 
     return results
+
+def record_search_rank(url, results, keyword, result_urls, num_results=10):
+    """
+    Record in results whether url is among the search results for its top keyword.
+    """
+    if serp_rank.rank_of(url, result_urls) is not None:
+        results['good'].append(
+            f"The site appears in the top {num_results} Google results for its top keyword: {keyword}!")
+    else:
+        results['bad'].append(
+            f"The site does not appear in the top {num_results} Google results for its top keyword: {keyword}.")
+
+def unreachable_results():
+    results = empty_results()
+    results['bad'].append("Error: Unable to access the website.")
+    return results
+
+def fetch_html(url):
+    """
+    Fetch url with retries; return its HTML, or None if it could not be loaded.
+    """
+    response = robust_request(url, HEADERS)
+    if not response or response.status_code != 200:
+        return None
+    return response.text
+
+def seo_analysis(url, rank_checker=None):
+    # Use robust_request instead of direct requests.get
+    html = fetch_html(url)
+    if html is None:
+        return unreachable_results()
+
+    # The rank lookup for the top keyword runs while the rest of the page is analyzed
+    rank_checker = rank_checker or serp_rank.get_rank_checker()
+    lookup = []
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        def start_rank_check(keywords):
+            if keywords:
+                lookup.append((keywords[0][0], pool.submit(rank_checker.search, keywords[0][0])))
+
+        results = analyze_page_content(url, html, on_keywords=start_rank_check)
+        for keyword, future in lookup:
+            try:
+                result_urls = future.result()
+            except Exception as exc:
+                print(f"Rank check for {url} failed: {exc}")
+                continue
+            record_search_rank(url, results, keyword, result_urls, rank_checker.num_results)
+    return results
+
+def analyze_page_task(payload):
+    url, html = payload
+    return analyze_page_content(url, html)
+
+def apply_rank_batch(pages, future, rank_checker):
+    """
+    Record one batch lookup's ranks in each page's results and yield the pages as (url, results).
+    """
+    try:
+        lookups = future.result()
+    except Exception as exc:
+        lookups = {}
+        print(f"Rank lookup failed: {exc}")
+    for url, results in pages:
+        keyword = results['keywords'][0][0]
+        result_urls = lookups.get(keyword)
+        if isinstance(result_urls, Exception):
+            print(f"Rank check for {url} failed: {result_urls}")
+        elif result_urls is not None:
+            record_search_rank(url, results, keyword, result_urls, rank_checker.num_results)
+        yield url, results
+
+def seo_analysis_many(urls, max_fetchers=16, check_rank=True, executor=None, rank_checker=None):
+    """
+    Run seo_analysis over many URLs, yielding (url, results) as each page completes.
+
+    Up to max_fetchers pages are fetched at once (urls may be any iterable, it is
+    consumed as slots free up). Pages that finish fetching together are analyzed
+    together, in the AnalysisExecutor's worker processes if one is given, otherwise
+    in this process. Their top keywords are then ranked with one batch lookup on the
+    fetch threads while other pages are being analyzed. Results come back in
+    completion order, not input order.
+    """
+    if check_rank:
+        rank_checker = rank_checker or serp_rank.get_rank_checker()
+    urls = iter(urls)
+    pool = ThreadPoolExecutor(max_workers=max_fetchers)
+    in_flight = {}  # future -> ('fetch', url, None) or ('rank', None, [(url, results), ...])
+    try:
+        while True:
+            fetching = sum(1 for kind, url, pages in in_flight.values() if kind == 'fetch')
+            for url in itertools.islice(urls, max_fetchers - fetching):
+                in_flight[pool.submit(fetch_html, url)] = ('fetch', url, None)
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            fetched = []
+            for future in done:
+                kind, url, pages = in_flight.pop(future)
+                if kind == 'rank':
+                    yield from apply_rank_batch(pages, future, rank_checker)
+                    continue
+                html = future.result()
+                if html is None:
+                    yield url, unreachable_results()
+                else:
+                    fetched.append((url, html))
+
+            if executor is None:
+                analyzed = [analyze_page_task(payload) for payload in fetched]
+            else:
+                analyzed = executor.map(analyze_page_task, fetched)
+            ranked = []
+            for (url, html), results in zip(fetched, analyzed):
+                if check_rank and results['keywords']:
+                    ranked.append((url, results))
+                else:
+                    yield url, results
+            if ranked:
+                keywords = [results['keywords'][0][0] for url, results in ranked]
+                in_flight[pool.submit(rank_checker.search_many, keywords)] = ('rank', None, ranked)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,227 @@
+# serp_rank.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from frontier import canonicalize_url
+
+# Default location of the persistent rank cache; override with SEO_SERP_CACHE
+DEFAULT_CACHE_PATH = os.environ.get('SEO_SERP_CACHE', 'serp_rank_cache.db')
+DEFAULT_LOCALE = 'en'
+
+
+def split_locale(locale):
+    """
+    'en' -> ('en', None), 'en-US' or 'en_US' -> ('en', 'us').
+    """
+    language, _, region = locale.replace('_', '-').partition('-')
+    return language.lower(), (region.lower() or None)
+
+
+def rank_of(url, result_urls):
+    """
+    1-based position of url in result_urls, comparing canonical URLs, or None if it is absent.
+    """
+    try:
+        target = canonicalize_url(url)
+    except ValueError:
+        target = url
+    for position, result in enumerate(result_urls, start=1):
+        try:
+            if canonicalize_url(result) == target:
+                return position
+        except ValueError:
+            continue
+    return None
+
+
+class RankProvider:
+    """
+    Source of search results. Subclasses implement search(); search_many() may be
+    overridden by providers that can answer several keywords in one call.
+    """
+
+    def search(self, keyword, locale=DEFAULT_LOCALE, num_results=10):
+        """
+        Return the result URLs for keyword, best first.
+        """
+        raise NotImplementedError
+
+    def search_many(self, keywords, locale=DEFAULT_LOCALE, num_results=10):
+        return {keyword: self.search(keyword, locale, num_results) for keyword in keywords}
+
+
+class GoogleSearchProvider(RankProvider):
+    """
+    Google results through the googlesearch package (imported on first use).
+    """
+
+    def __init__(self, sleep_interval=0, timeout=5):
+        self.sleep_interval = sleep_interval
+        self.timeout = timeout
+
+    def search(self, keyword, locale=DEFAULT_LOCALE, num_results=10):
+        import googlesearch
+
+        language, region = split_locale(locale)
+        return list(googlesearch.search(keyword, num_results=num_results, lang=language, region=region,
+                                        sleep_interval=self.sleep_interval, timeout=self.timeout))
+
+
+class StaticRankProvider(RankProvider):
+    """
+    Offline provider answering from a fixed {keyword: [url, ...]} mapping, for tests and benchmarks.
+    Unknown keywords have no results. Every lookup is counted in calls.
+    """
+
+    def __init__(self, results=None):
+        self.results = results or {}
+        self.calls = 0
+
+    def search(self, keyword, locale=DEFAULT_LOCALE, num_results=10):
+        self.calls += 1
+        return list(self.results.get(keyword, []))[:num_results]
+
+
+class RankCache:
+    """
+    Persistent SQLite cache of search results keyed by (keyword, locale), valid for ttl seconds.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, ttl=24 * 3600):
+        self.path = path
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS serp (
+                keyword TEXT,
+                locale TEXT,
+                num_results INTEGER,
+                results TEXT,
+                fetched_at REAL,
+                PRIMARY KEY (keyword, locale)
+            )""")
+        # Expired rows are never read again; drop them so the file does not grow run after run
+        self.purge_expired()
+
+    def get_many(self, keywords, locale, num_results):
+        """
+        Return {keyword: urls} for the keywords with a fresh entry covering num_results.
+        """
+        keywords = list(keywords)
+        found = {}
+        oldest = time.time() - self.ttl
+        for start in range(0, len(keywords), 500):
+            chunk = keywords[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT keyword, results FROM serp WHERE locale = ? AND keyword IN ({placeholders}) "
+                    "AND fetched_at >= ? AND num_results >= ?",
+                    [locale, *chunk, oldest, num_results]).fetchall()
+            for keyword, results in rows:
+                found[keyword] = json.loads(results)[:num_results]
+        return found
+
+    def put_many(self, results, locale, num_results):
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO serp (keyword, locale, num_results, results, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(keyword, locale, num_results, json.dumps(urls), now) for keyword, urls in results.items()])
+
+    def purge_expired(self):
+        with self.lock:
+            self.conn.execute("DELETE FROM serp WHERE fetched_at < ?", (time.time() - self.ttl,))
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class RankChecker:
+    """
+    Rank lookups through a provider, answered from a RankCache when possible.
+
+    search_many() looks up only the keywords missing from the cache, up to
+    max_workers of them at a time, and stores the answers. Provider failures
+    are reported per keyword and not cached.
+    """
+
+    def __init__(self, provider=None, cache=None, locale=DEFAULT_LOCALE, num_results=10, max_workers=4):
+        self.provider = provider if provider is not None else GoogleSearchProvider()
+        self.cache = cache
+        self.locale = locale
+        self.num_results = num_results
+        self.max_workers = max_workers
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _lookup(self, keyword):
+        try:
+            return keyword, self.provider.search(keyword, self.locale, self.num_results), None
+        except Exception as exc:
+            return keyword, None, exc
+
+    def search_many(self, keywords):
+        """
+        Return {keyword: result urls}; keywords whose lookup failed map to an exception instead.
+        """
+        keywords = list(dict.fromkeys(keywords))
+        results = self.cache.get_many(keywords, self.locale, self.num_results) if self.cache is not None else {}
+        missing = [keyword for keyword in keywords if keyword not in results]
+        with self._lock:
+            self.hits += len(results)
+            self.misses += len(missing)
+        if missing:
+            if len(missing) == 1 or self.max_workers <= 1:
+                lookups = [self._lookup(keyword) for keyword in missing]
+            else:
+                with ThreadPoolExecutor(max_workers=min(self.max_workers, len(missing))) as pool:
+                    lookups = list(pool.map(self._lookup, missing))
+            fetched = {keyword: urls for keyword, urls, error in lookups if error is None}
+            if self.cache is not None and fetched:
+                self.cache.put_many(fetched, self.locale, self.num_results)
+            results.update(fetched)
+            results.update({keyword: error for keyword, urls, error in lookups if error is not None})
+        return results
+
+    def search(self, keyword):
+        """
+        Return the result urls for keyword; raises the provider's exception if the lookup failed.
+        """
+        result = self.search_many([keyword])[keyword]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+_checker = None
+_checker_lock = threading.Lock()
+
+
+def get_rank_checker():
+    """
+    Return the process-wide RankChecker: Google results cached at DEFAULT_CACHE_PATH.
+    """
+    global _checker
+    with _checker_lock:
+        if _checker is None:
+            _checker = RankChecker(GoogleSearchProvider(), RankCache(DEFAULT_CACHE_PATH))
+        return _checker
+
+
+def set_rank_checker(checker):
+    """
+    Replace the process-wide RankChecker, e.g. with a StaticRankProvider-backed one for offline runs.
+    """
+    global _checker
+    with _checker_lock:
+        _checker = checker
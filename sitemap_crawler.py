@@ -2,6 +2,7 @@
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
+import http_client
 from bs4 import BeautifulSoup
 import datetime
 import threading
@@ -52,7 +53,7 @@ def extract_keywords(sitemap_data):
     corpus = []
     for url in sitemap_data.keys():
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'html.parser')
             text = soup.get_text()
@@ -72,7 +73,7 @@ def content_organization_strategy(sitemap_data, main_save_directory):
     analysis_results = []
     for url in sitemap_data.keys():
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'html.parser')
             headings = [heading.text.strip() for heading in soup.find_all(['h1', 'h2', 'h3', 'h4', 'h5', 'h6'])]
@@ -123,7 +124,7 @@ def url_optimization_analysis(sitemap_data, keywords, main_save_directory):
     url_analysis_results = []
     for url in sitemap_data.keys():
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'html.parser')
             result = {
@@ -157,7 +158,7 @@ def content_analysis_input(sitemap_data, main_save_directory):
     content_results = []
     for url in sitemap_data.keys():
         try:
-            response = requests.get(url, headers=headers, timeout=10)
+            response = http_client.get(url, headers=headers, timeout=10)
             response.raise_for_status()
             soup = BeautifulSoup(response.text, 'html.parser')
             text_content = soup.get_text()
@@ -229,7 +230,7 @@ class Crawler:
     def format_url(url):
         if not url.startswith('http'):
             try:
-                requests.head('https://' + url, timeout=5, headers=headers)
+                http_client.head('https://' + url, timeout=5, headers=headers)
                 return 'https://' + url
             except requests.RequestException:
                 return 'http://' + url
@@ -243,7 +244,7 @@ class Crawler:
             self.sitemap[url] = []
 
         try:
-            response = requests.get(url, timeout=self.timeout, headers=headers)
+            response = http_client.get(url, timeout=self.timeout, headers=headers)
             response.raise_for_status()
         except (requests.RequestException, ValueError):
             return
@@ -0,0 +1,74 @@
+# sitemap_io.py
+
+import json
+import threading
+
+
+class SitemapWriter:
+    """
+    Append-only JSON Lines sitemap: one {"url": ..., "links": [...]} record per page, written as pages complete.
+    """
+
+    def __init__(self, path, mode='w'):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(path, mode, encoding='utf-8')
+
+    def write(self, url, links):
+        line = json.dumps({"url": url, "links": links}) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self.file.closed:
+                self.file.close()
+
+
+def iter_sitemap(path):
+    """
+    Yield (url, links) pairs from a sitemap file.
+
+    JSON Lines files are read one record at a time in constant memory; a legacy
+    sitemap.json is still accepted but has to be loaded whole.
+    """
+    if path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as file:
+            for line in file:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["url"], record["links"]
+    else:
+        with open(path, 'r') as file:
+            sitemap_data = json.load(file)
+        yield from sitemap_data.items()
+
+
+def write_sitemap_jsonl(sitemap_data, path):
+    writer = SitemapWriter(path)
+    try:
+        for url, links in sitemap_data.items():
+            writer.write(url, links)
+    finally:
+        writer.close()
+
+
+def export_sitemap_json(jsonl_path, json_path):
+    """
+    Convert a JSON Lines sitemap into the sitemap.json layout one record at a time.
+    """
+    with open(json_path, 'w', encoding='utf-8') as file:
+        file.write("{")
+        first = True
+        for url, links in iter_sitemap(jsonl_path):
+            file.write("" if first else ",")
+            first = False
+            file.write(f"\n  {json.dumps(url)}: ")
+            if links:
+                file.write("[\n" + ",\n".join(f"    {json.dumps(link)}" for link in links) + "\n  ]")
+            else:
+                file.write("[]")
+        file.write("\n}" if not first else "}")
+    return json_path
+
@@ -1,92 +1,236 @@
 # site_visualization.py
 
-import json
-import networkx as nx
-import matplotlib.pyplot as plt
 import collections
-from urllib.parse import urlparse
+import json
 import os
+import numpy as np
+from scipy import sparse
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from link_graph import LinkGraph, host_and_path, host_key
+from analysis_executor import AnalysisExecutor
+
+# Most nodes drawn in the site structure chart; bigger graphs are aggregated or sampled
+MAX_LAYOUT_NODES = 500
+# Node-iterations the spring layout may spend; iterations shrink as the node count grows
+LAYOUT_BUDGET = 10000
+# Edges drawn with arrowheads; denser views are drawn with plain lines
+MAX_ARROWS = 300
+
+
+def new_figure(figsize):
+    # Figures are rendered straight to the Agg canvas: no GUI backend and nothing to show()
+    figure = Figure(figsize=figsize)
+    FigureCanvasAgg(figure)
+    return figure
+
+
+def no_data(ax, message="No data"):
+    ax.text(0.5, 0.5, message, ha='center', va='center', fontsize=16, transform=ax.transAxes)
+    ax.set_axis_off()
+
+
+def section_of(url, base_host, depth=1):
+    """
+    The site section a URL belongs to: its first depth path segments on the start page's
+    host (e.g. '/blog'), or the bare host for external URLs.
+    """
+    host, path = host_and_path(url)
+    if host != base_host:
+        return host
+    segments = [segment for segment in path.split('/') if segment][:depth]
+    return '/' + '/'.join(segments)
+
+
+def top_by_degree(matrix, limit):
+    """
+    Indices of the limit nodes with the most links in and out, in index order.
+    """
+    degree = np.diff(matrix.indptr) + np.bincount(matrix.indices, minlength=matrix.shape[0])
+    if matrix.shape[0] <= limit:
+        return np.arange(matrix.shape[0])
+    return np.sort(np.argpartition(-degree, limit - 1)[:limit])
+
+
+def structure_view(graph, view='auto', max_nodes=MAX_LAYOUT_NODES, section_depth=1):
+    """
+    Reduce a LinkGraph to at most max_nodes nodes for drawing.
+
+    'pages' draws pages, keeping the best-connected ones when there are too many.
+    'sections' merges pages into site sections (see section_of) with link counts
+    as edge weights. 'auto' draws pages when they fit and sections otherwise.
+    Returns plain data: {'title', 'labels', 'sizes', 'edges': [(i, j, weight)]}.
+    """
+    matrix = graph.matrix
+    n = len(graph)
+    if view == 'auto':
+        view = 'pages' if n <= max_nodes else 'sections'
+    if view == 'sections':
+        base_host = host_key(graph.base_url) if graph.base_url else None
+        section_ids = {}
+        membership = np.array([section_ids.setdefault(section_of(url, base_host, section_depth), len(section_ids))
+                               for url in graph.urls], dtype=np.int64)
+        indicator = sparse.csr_matrix((np.ones(n), (np.arange(n), membership)), shape=(n, len(section_ids)))
+        matrix = (indicator.T @ matrix @ indicator).tocsr()
+        labels = list(section_ids)
+        sizes = np.bincount(membership, minlength=len(labels))
+        title = "Site Structure by Section"
+    else:
+        labels = graph.urls
+        sizes = np.ones(n, dtype=np.int64)
+        title = "Site Structure Visualization"
+
+    keep = top_by_degree(matrix, max_nodes)
+    if len(keep) < matrix.shape[0]:
+        title += f" (top {len(keep)} of {matrix.shape[0]} by links)"
+    matrix = matrix[keep][:, keep].tocoo()
+    not_self = matrix.row != matrix.col
+    return {
+        'title': title,
+        'labels': [labels[i] for i in keep],
+        'sizes': sizes[keep].tolist(),
+        'edges': list(zip(matrix.row[not_self].tolist(), matrix.col[not_self].tolist(),
+                          matrix.data[not_self].tolist())),
+    }
+
+
+def render_structure(data, path, layout_budget=LAYOUT_BUDGET):
+    import networkx as nx
+
+    figure = new_figure((14, 10))
+    ax = figure.add_subplot()
+    labels = data['labels']
+    if not labels:
+        no_data(ax, "No pages to draw")
+    else:
+        G = nx.DiGraph()
+        G.add_nodes_from(range(len(labels)))
+        G.add_weighted_edges_from(data['edges'])
+        iterations = max(5, min(50, layout_budget // len(labels)))
+        pos = nx.spring_layout(G, seed=42, iterations=iterations, weight=None)
+        sizes = np.asarray(data['sizes'], dtype=float)
+        node_size = 10 if sizes.max() <= 1 else 10 + 290 * sizes / sizes.max()
+        # Arrow patches cost far more to draw than plain lines, so dense views use lines
+        weights = np.asarray([weight for _, _, weight in data['edges']], dtype=float)
+        width = 1.0 if not len(weights) or weights.max() <= 1 else 0.3 + 2.7 * np.sqrt(weights / weights.max())
+        nx.draw(G, pos, ax=ax, with_labels=False, node_size=node_size, node_color="blue", edge_color="gray",
+                width=width, arrows=len(weights) <= MAX_ARROWS, arrowsize=10)
+        if len(labels) <= 60 and sizes.max() > 1:
+            nx.draw_networkx_labels(G, pos, labels=dict(enumerate(labels)), font_size=8, ax=ax)
+    ax.set_title(data['title'])
+    figure.savefig(path, bbox_inches='tight')
+
+
+def render_link_distribution(degree_count, path):
+    figure = new_figure((14, 10))
+    ax = figure.add_subplot()
+    if not degree_count:
+        no_data(ax, "No outbound links")
+    else:
+        deg, cnt = zip(*degree_count)
+        ax.bar(deg, cnt, color="blue")
+        ax.set_xlabel("Number of Outbound Links")
+        ax.set_ylabel("Number of Pages")
+    ax.set_title("Page Link Distribution Analysis")
+    figure.tight_layout()
+    figure.savefig(path, bbox_inches='tight')
+
+
+def render_external_domains(top_domains, path):
+    figure = new_figure((18, 10))
+    ax = figure.add_subplot()
+    if not top_domains:
+        no_data(ax, "No external links")
+    else:
+        labels, values = zip(*top_domains)
+        ax.bar(labels, values, color="blue")
+        ax.set_xlabel("Domains")
+        ax.set_ylabel("Number of Links")
+        ax.tick_params(axis='x', labelrotation=45)
+    ax.set_title("Top 10 External Domains Linked From the Site")
+    figure.tight_layout()
+    figure.subplots_adjust(bottom=0.25)
+    figure.savefig(path, bbox_inches='tight')
+
+
+def render_link_split(split, path):
+    figure = new_figure((6.4, 4.8))
+    ax = figure.add_subplot()
+    if not any(split):
+        no_data(ax, "No links")
+    else:
+        ax.pie(split, labels=['Internal', 'External'], colors=['blue', 'orange'], autopct='%1.1f%%')
+    ax.set_title('Internal vs External Links Distribution')
+    figure.savefig(path)
+
+
+def render_most_linked(top_linked_pages, path):
+    figure = new_figure((20, 10))
+    ax = figure.add_subplot()
+    if not top_linked_pages:
+        no_data(ax, "No linked pages")
+    else:
+        pages, links_count = zip(*top_linked_pages)
+        ax.bar(pages, links_count, color='blue')
+        ax.set_xlabel('Pages')
+        ax.set_ylabel('Number of Inbound Links')
+        ax.tick_params(axis='x', labelrotation=75)
+    ax.set_title('Top 10 Most Linked Pages')
+    figure.tight_layout()
+    figure.subplots_adjust(bottom=0.35)
+    figure.savefig(path, bbox_inches='tight')
+
+
+RENDERERS = {
+    'structure': render_structure,
+    'link_distribution': render_link_distribution,
+    'external_domains': render_external_domains,
+    'link_split': render_link_split,
+    'most_linked': render_most_linked,
+}
+
+
+def render_chart(job):
+    """
+    Render one chart from (renderer name, data, output path); a module-level task for AnalysisExecutor.
+    """
+    name, data, path = job
+    RENDERERS[name](data, path)
+    return path
+
+
+def analyze_sitemap(file_path, executor=None, view='auto', max_nodes=MAX_LAYOUT_NODES, section_depth=1):
+    """
+    Chart the link structure of a saved sitemap (sitemap.jsonl or sitemap.json).
+    Records are streamed from the file in a single pass into a LinkGraph, whose
+    metrics are also saved to link_analysis.json next to the sitemap.
 
-def analyze_sitemap(file_path):
-    with open(file_path, 'r') as file:
-        sitemap_data = json.load(file)
-
-    base_url = list(sitemap_data.keys())[0]
-    G = nx.DiGraph()
-    internal_links = 0
-    external_links = 0
-    inbound_links = collections.Counter()
-
-    for page, links in sitemap_data.items():
-        G.add_node(page)
-        for link in links:
-            G.add_edge(page, link)
-            if base_url in link:
-                internal_links += 1
-            else:
-                external_links += 1
-            inbound_links[link] += 1
+    Charts are written as PNGs next to the sitemap without opening any window. They
+    are rendered in the executor's worker processes (default: one per chart). The
+    structure chart draws at most max_nodes nodes; see structure_view for view.
+    Returns the link metrics summary.
+    """
+    graph = LinkGraph.from_sitemap(file_path)
+    summary = graph.summary()
 
     save_directory = os.path.dirname(file_path)
+    with open(os.path.join(save_directory, 'link_analysis.json'), 'w') as file:
+        json.dump(summary, file, indent=2)
 
-    # Site Structure Visualization
-    plt.figure(figsize=(14, 10))
-    pos = nx.spring_layout(G, seed=42)
-    nx.draw(G, pos, with_labels=False, node_size=10, font_size=8, node_color="blue", edge_color="gray", arrowsize=10)
-    plt.title("Site Structure Visualization")
-    plt.savefig(os.path.join(save_directory, 'site_structure.png'), bbox_inches='tight')
-    plt.show()
-
-    # Page Link Distribution Analysis
-    plt.figure(figsize=(14, 10))
-    out_degrees = [degree for node, degree in G.out_degree() if degree > 0]
-    degree_count = collections.Counter(out_degrees)
-    deg, cnt = zip(*degree_count.items())
-    plt.bar(deg, cnt, color="blue")
-    plt.title("Page Link Distribution Analysis")
-    plt.xlabel("Number of Outbound Links")
-    plt.ylabel("Number of Pages")
-    plt.tight_layout()
-    plt.savefig(os.path.join(save_directory, 'link_distribution.png'), bbox_inches='tight')
-    plt.show()
-
-    # Top 10 External Domains Linked From the Site
-    plt.figure(figsize=(18, 10))
-    external_domains = collections.Counter()
-    for links in sitemap_data.values():
-        for link in links:
-            if base_url not in link:
-                domain = urlparse(link).netloc
-                external_domains[domain] += 1
-    top_domains = external_domains.most_common(10)
-    labels, values = zip(*top_domains)
-    plt.bar(labels, values, color="blue")
-    plt.title("Top 10 External Domains Linked From the Site")
-    plt.xlabel("Domains")
-    plt.ylabel("Number of Links")
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.subplots_adjust(bottom=0.25)
-    plt.savefig(os.path.join(save_directory, 'external_domains.png'), bbox_inches='tight')
-    plt.show()
-
-    # Internal vs. External Links Distribution
-    plt.pie([internal_links, external_links], labels=['Internal', 'External'], colors=['blue', 'orange'], autopct='%1.1f%%')
-    plt.title('Internal vs External Links Distribution')
-    plt.savefig(os.path.join(save_directory, 'internal_external_links.png'))
-    plt.show()
-
-    # Top 10 Most Linked Pages
-    plt.figure(figsize=(20, 10))  # Increase the figure size
-    top_linked_pages = inbound_links.most_common(10)
-    pages, links_count = zip(*top_linked_pages)
-    plt.bar(pages, links_count, color='blue')
-    plt.title('Top 10 Most Linked Pages')
-    plt.xlabel('Pages')
-    plt.ylabel('Number of Inbound Links')
-    plt.xticks(rotation=75)  # Rotate the labels by 75 degrees
-    plt.tight_layout()
-    plt.subplots_adjust(bottom=0.35)  # Adjust the bottom margin
-    plt.savefig(os.path.join(save_directory, 'most_linked_pages.png'), bbox_inches='tight')
-    plt.show()
+    out_degrees = graph.out_degree()
+    degree_count = sorted(collections.Counter(out_degrees[out_degrees > 0].tolist()).items())
+    jobs = [
+        ('structure', structure_view(graph, view, max_nodes, section_depth),
+         os.path.join(save_directory, 'site_structure.png')),
+        ('link_distribution', degree_count, os.path.join(save_directory, 'link_distribution.png')),
+        ('external_domains', summary['top_external_domains'], os.path.join(save_directory, 'external_domains.png')),
+        ('link_split', graph.link_split(), os.path.join(save_directory, 'internal_external_links.png')),
+        ('most_linked', summary['most_linked_pages'], os.path.join(save_directory, 'most_linked_pages.png')),
+    ]
 
+    if executor is None:
+        with AnalysisExecutor(max_workers=min(len(jobs), os.cpu_count() or 1), chunksize=1) as executor:
+            executor.map(render_chart, jobs)
+    else:
+        executor.map(render_chart, jobs)
+    return summary
@@ -0,0 +1,92 @@
+# tests/conftest.py
+
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class LocalSite:
+    """
+    A small website on 127.0.0.1 for crawl tests.
+
+    pages maps a path to its HTML; '{origin}' in the HTML is replaced with the
+    server's origin, since the crawler only follows absolute links. Paths in
+    delays are answered that many seconds late. Every request path is recorded
+    in requests.
+    """
+
+    def __init__(self, pages, robots_txt=None, delays=None):
+        self.pages = pages
+        self.robots_txt = robots_txt
+        self.delays = delays or {}
+        self.requests = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self.handler())
+        self.server.daemon_threads = True
+        self.origin = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def url(self, path='/'):
+        return self.origin + path
+
+    def requested(self, path):
+        with self.lock:
+            return path in self.requests
+
+    def handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with site.lock:
+                    site.requests.append(self.path)
+                time.sleep(site.delays.get(self.path, 0))
+                if self.path == '/robots.txt' and site.robots_txt is not None:
+                    self.respond(200, site.robots_txt, 'text/plain')
+                elif self.path in site.pages:
+                    self.respond(200, site.pages[self.path].replace('{origin}', site.origin), 'text/html')
+                else:
+                    self.respond(404, "Not found", 'text/plain')
+
+            def respond(self, status, text, content_type):
+                body = text.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def links_to(*paths):
+    return "<html><body>" + "".join(f"<a href='{{origin}}{path}'>{path}</a>" for path in paths) + "</body></html>"
+
+
+@pytest.fixture
+def local_site():
+    sites = []
+
+    def start(pages, robots_txt=None, delays=None):
+        site = LocalSite(pages, robots_txt, delays)
+        sites.append(site)
+        return site
+
+    yield start
+    for site in sites:
+        site.close()
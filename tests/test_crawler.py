@@ -0,0 +1,58 @@
+# tests/test_crawler.py
+
+from conftest import links_to
+from crawler import Crawler
+from frontier import canonicalize_url
+
+
+def make_crawler(site, max_depth=3, **options):
+    return Crawler(site.url(), max_depth=max_depth, max_threads=4, crawl_delay=0, **options)
+
+
+def test_resume_keeps_robots_disallowed_urls_out(local_site, tmp_path):
+    site = local_site({
+        '/': links_to('/page/1', '/page/2'),
+        '/page/1': links_to('/page/10'),
+        '/page/2': links_to('/page/3'),
+        '/page/3': links_to(),
+    }, robots_txt="User-agent: *\nDisallow: /page/1\n")
+    checkpoint_path = str(tmp_path / 'crawl_checkpoint.db')
+
+    first = make_crawler(site)
+    first.enable_checkpoint(checkpoint_path)
+    first.crawl()
+    first.checkpoint.close()
+    assert first.skipped == 1
+
+    resumed = make_crawler(site)
+    resumed.enable_checkpoint(checkpoint_path, resume=True)
+    requests_before = len(site.requests)
+    resumed.crawl()
+    resumed.checkpoint.close()
+
+    disallowed = canonicalize_url(site.url('/page/1'))
+    assert disallowed not in resumed.sitemap
+    assert set(resumed.sitemap) == {canonicalize_url(site.url(path)) for path in ('/', '/page/2', '/page/3')}
+    assert resumed.skipped == 1
+    assert len(site.requests) == requests_before
+    assert not site.requested('/page/1') and not site.requested('/page/10')
+
+
+def test_url_found_again_closer_to_the_start_is_crawled_at_that_depth(local_site):
+    # /x is first reached through /b -> /c at depth 3, where its link to /y is too deep to follow.
+    # The slow /a links to it from depth 1, so a breadth-first crawl reaches /y at depth 3.
+    site = local_site({
+        '/': links_to('/a', '/b'),
+        '/a': links_to('/x'),
+        '/b': links_to('/c'),
+        '/c': links_to('/x'),
+        '/x': links_to('/y'),
+        '/y': links_to(),
+    }, delays={'/a': 0.5})
+
+    crawler = make_crawler(site, max_depth=4, respect_robots=False)
+    crawler.crawl()
+
+    assert canonicalize_url(site.url('/y')) in crawler.sitemap
+    assert crawler.depths[canonicalize_url(site.url('/x'))] == 2
+    assert site.requests.count('/x') == 1